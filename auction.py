@@ -0,0 +1,169 @@
+"""
+Distributed bundle auction of the "auction" allocation mode (CBBA-like):
+- The E-QC broadcasts the detected PoIs nobody has won yet (ANNOUNCE). V-QCs
+  learn tasks from it or from their neighbours' BIDs, so allocation also
+  reaches V-QCs out of E-QC range.
+- Each V-QC bids urgency / distance (the score of the central policies) on
+  the open PoIs it can still take, keeps the best bid seen per PoI and
+  broadcasts that table (BID) at the end of any AUCTION_PERIOD round in which
+  it changed, and at least every AUCTION_HEARTBEAT. Tables merge by
+  max-consensus (ties: lowest V-QC id), so V-QCs that hear each other agree
+  on the winners without the E-QC.
+- A V-QC commits (flies) to a PoI after holding the best bid for
+  AUCTION_SETTLE seconds, and drops it if outbid later. Discovered PoIs are
+  broadcast as done for AUCTION_DONE_TTL seconds and then forgotten.
+- Bids travel as float32: they are rounded before use, so every V-QC
+  compares exactly the values that go over the radio.
+"""
+import math
+import struct
+from typing import Dict, Iterable, List, Optional
+
+import config
+from poi_buffers import PoISet
+from poi_registry import registry
+
+NO_WINNER = 0xFFFF          # "winner" de una tarea conocida sin pujas
+DONE = 0xFFFE               # "winner" de un PoI ya descubierto
+MAX_ENTRIES = 255           # entradas por mensaje (contador uint8 del formato binario)
+
+_F32 = struct.Struct("<f")
+
+
+def f32(x: float) -> float:
+    """x redondeado a float32, como viaja en un BID."""
+    return _F32.unpack(_F32.pack(x))[0]
+
+
+class _Task:
+    __slots__ = ("ts", "winner", "bid", "since")
+
+    def __init__(self, ts: float, winner: int, bid: float, since: float):
+        self.ts = ts            # detección del PoI por el EQC
+        self.winner = winner
+        self.bid = bid
+        self.since = since      # desde cuándo lo gana `winner`
+
+
+def _beats(bid: float, winner: int, task: _Task) -> bool:
+    if task.winner == NO_WINNER:
+        return True
+    return bid > task.bid or (bid == task.bid and winner < task.winner)
+
+
+class BundleAuction:
+    """Estado de la subasta de un VQC: tabla de mejores pujas por PoI."""
+
+    def __init__(self, vid: int):
+        self.vid = vid
+        self.tasks: Dict[int, _Task] = {}     # PoI abierto → mejor puja conocida
+        self.committed: Dict[int, None] = {}  # PoIs ganados y ya pasados a next2visit
+        self._done: Dict[int, float] = {}     # PoI cerrado → instante (se difunde hasta el TTL)
+        self._closed = PoISet()               # PoIs cerrados: no se reabren nunca
+        self.changed = False                  # algo que difundir desde el último BID
+        self.bids_placed = 0
+        self.bids_lost = 0
+
+    def learn(self, pois: Iterable, now: float) -> None:
+        """Tareas anunciadas por el EQC ({"idx", "ts"})."""
+        for p in pois:
+            idx = p["idx"]
+            if idx not in self._closed and idx not in self.tasks:
+                self.tasks[idx] = _Task(p["ts"], NO_WINNER, 0.0, now)
+                self.changed = True
+
+    def merge(self, bids: Iterable, now: float) -> List[int]:
+        """
+        Funde el BID de un vecino. Devuelve los PoIs que este VQC tenía
+        comprometidos y ya no le tocan (superado o descubierto por otro).
+        """
+        dropped = []
+        for b in bids:
+            idx, winner = b["idx"], b["winner"]
+            if idx in self._closed:
+                continue
+            if winner == DONE:
+                if idx in self.committed:
+                    dropped.append(idx)
+                self.close(idx, now)
+                continue
+            task = self.tasks.get(idx)
+            if task is None:
+                self.tasks[idx] = _Task(b["ts"], winner, b["bid"], now)
+                self.changed = True
+            elif winner != NO_WINNER and _beats(b["bid"], winner, task):
+                self.changed = True
+                if task.winner == self.vid:
+                    self.bids_lost += 1
+                    if idx in self.committed:
+                        del self.committed[idx]
+                        dropped.append(idx)
+                task.winner, task.bid, task.since = winner, b["bid"], now
+        return dropped
+
+    def bid(self, x: float, y: float, free: int, now: float) -> int:
+        """
+        Puja por los mejores PoIs abiertos que aún ganaría, hasta ocupar los
+        `free` huecos de next2visit (las pujas ganadas sin comprometer también
+        ocupan hueco). Devuelve cuántas pujas nuevas hizo.
+        """
+        slots = free - sum(1 for idx, t in self.tasks.items()
+                           if t.winner == self.vid and idx not in self.committed)
+        if slots <= 0:
+            return 0
+        reg = registry()
+        offers = []
+        for idx, task in self.tasks.items():
+            if task.winner == self.vid:
+                continue
+            px, py = reg.xy[idx]
+            mine = f32(int(reg.urgency[idx]) / max(1e-6, math.hypot(x - px, y - py)))
+            if _beats(mine, self.vid, task):
+                offers.append((-mine, idx))
+        offers.sort()
+        for neg, idx in offers[:slots]:
+            task = self.tasks[idx]
+            task.winner, task.bid, task.since = self.vid, -neg, now
+        placed = min(slots, len(offers))
+        self.bids_placed += placed
+        self.changed = self.changed or placed > 0
+        return placed
+
+    def settled(self, now: float) -> List[int]:
+        """PoIs ganados desde hace AUCTION_SETTLE s: se comprometen (mejor puja primero)."""
+        ready = [(-t.bid, idx) for idx, t in self.tasks.items()
+                 if t.winner == self.vid and idx not in self.committed
+                 and now - t.since >= config.AUCTION_SETTLE - 1e-9]
+        ready.sort()
+        for _, idx in ready:
+            self.committed[idx] = None
+        return [idx for _, idx in ready]
+
+    def close(self, idx: int, now: float) -> None:
+        """PoI descubierto: se cierra y se difunde como DONE (sólo si alguien lo conocía por la subasta)."""
+        if idx in self._closed:
+            return
+        self._closed.add(idx)
+        self.committed.pop(idx, None)
+        if self.tasks.pop(idx, None) is not None:
+            self._done[idx] = now
+            self.changed = True
+
+    def ts(self, idx: int) -> Optional[float]:
+        task = self.tasks.get(idx)
+        return task.ts if task else None
+
+    def entries(self, now: float) -> List[Dict]:
+        """Entradas del próximo BID: cerrados recientes, luego los míos, luego el resto."""
+        self.changed = False
+        for idx in [i for i, t in self._done.items() if now - t > config.AUCTION_DONE_TTL]:
+            del self._done[idx]
+        out = [{"idx": idx, "ts": 0.0, "winner": DONE, "bid": 0.0} for idx in self._done]
+        mine = [i for i, t in self.tasks.items() if t.winner == self.vid]
+        rest = [i for i, t in self.tasks.items() if t.winner != self.vid]
+        for idx in mine + rest:
+            if len(out) >= MAX_ENTRIES:
+                break
+            t = self.tasks[idx]
+            out.append({"idx": idx, "ts": t.ts, "winner": t.winner, "bid": t.bid})
+        return out[:MAX_ENTRIES]
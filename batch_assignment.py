@@ -0,0 +1,195 @@
+"""
+Batch min-cost assignment of pending PoIs to V-QC slots ("optimal_batch" policy):
+- Every eligible V-QC contributes cap = min(free slots, MAX_ASSIGN_PER_ENCOUNTER
+  left) identical slots; one matching over all slots maximises the total
+  urgency / distance score (the score the other policies use greedily).
+- Sparse candidates: each V-QC only considers its top-K PoIs by score
+  (K = BATCH_CANDIDATES × its slots, or every slot's worth when the problem is
+  small, which makes the matching exact). Within an urgency level the best
+  scores are the nearest PoIs, so K nearest pending PoIs per level, merged,
+  are exactly the top-K by score. When K covers every pending PoI the V × P
+  score matrix is computed directly instead.
+- BatchAssigner keeps the k-d tree of each urgency level's pending PoIs
+  between solves and only rebuilds the levels whose pending set changed.
+- The slot × candidate graph, plus one zero-benefit dummy per slot so a slot
+  may stay empty, is solved with scipy's sparse LAPJV
+  (min_weight_full_bipartite_matching). Candidate columns are numbered through
+  a registry-sized lookup table (no sort) and results are ordered with the
+  candidate scores already at hand.
+- `python batch_assignment.py` times a solve at 50 V-QCs × 1000 pending PoIs,
+  checks it against the BUDGET_MS budget, and compares it with
+  one-VQC-at-a-time greedy and with the exact matching.
+"""
+import argparse
+import gc
+import math
+import sys
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+from scipy.spatial import cKDTree
+
+from pending_store import PendingStore
+
+EXACT_MAX = 5_000           # slots × pendientes hasta el que K cubre todos los slots (reparto exacto)
+BUDGET_MS = 1.0             # presupuesto de una resolución a 50 VQCs × 1000 pendientes (mediana del bench)
+
+
+class BatchAssigner:
+    """Reparto optimal_batch sobre los PoIs del registro (coords/urgency son sus arrays)."""
+
+    def __init__(self, coords: np.ndarray, urgency: np.ndarray):
+        self.coords = np.asarray(coords, dtype=np.float64)
+        self.urgency = np.asarray(urgency)
+        self._trees: Dict[int, Tuple[np.ndarray, cKDTree]] = {}     # nivel → (pendientes, árbol)
+        self._col = np.empty(len(self.coords), dtype=np.int64)     # PoI → columna del grafo
+
+    def solve(self, pending: Iterable[int], vqc_xy: Sequence[Tuple[float, float]],
+              caps: Sequence[int], candidates: int) -> List[List[int]]:
+        """
+        Reparto de los PoIs `pending` (índices del registro) entre los VQCs, que
+        maximiza la suma de urgency / distancia sobre los candidatos. Devuelve,
+        por VQC, la lista de PoIs asignados (mejor score primero).
+        """
+        n_vqc = len(caps)
+        caps = np.asarray(caps, dtype=np.int64)
+        pend = np.fromiter(pending, dtype=np.int64)
+        n_slots = int(caps.sum())
+        if not n_vqc or not len(pend) or n_slots <= 0:
+            return [[] for _ in range(n_vqc)]
+
+        k = n_slots if n_slots * len(pend) <= EXACT_MAX else candidates * int(caps.max())
+        k = min(k, len(pend))
+        cand, score = self._candidates(pend, np.asarray(vqc_xy, dtype=np.float64), k)
+
+        # Filas: un slot por hueco de cada VQC. Columnas: PoIs candidatos distintos + un
+        # dummy por slot. Cada PoI se numera por su última aparición en cand, con una
+        # tabla del tamaño del registro que se sobrescribe y nunca se limpia (sin ordenar).
+        flat = cand.ravel()
+        pos = np.arange(flat.size)
+        self._col[flat] = pos
+        last = self._col[flat]
+        is_col = last == pos
+        n_cols = int(is_col.sum())
+        col_of = (np.cumsum(is_col) - 1)[last].reshape(cand.shape)
+        poi_of = flat[is_col]                               # columna → PoI (is_col: última aparición de cada PoI)
+        owner = np.repeat(np.arange(n_vqc), caps)               # VQC de cada slot
+        big = float(score.max()) + 1.0                          # pesos > 0: big - score
+        data = np.empty((n_slots, k + 1))
+        index = np.empty((n_slots, k + 1), dtype=np.int32)     # índices int32: csr_matrix no los copia
+        data[:, :k] = big - score[owner]
+        index[:, :k] = col_of[owner]
+        data[:, k] = big
+        index[:, k] = np.arange(n_cols, n_cols + n_slots)
+        graph = csr_matrix((data.ravel(), index.ravel(), np.arange(0, n_slots * (k + 1) + 1, k + 1, dtype=np.int32)),
+                           shape=(n_slots, n_cols + n_slots))
+        row, col = min_weight_full_bipartite_matching(graph)
+
+        taken = col < n_cols
+        row, col = row[taken], col[taken]
+        # Score de cada pareja: la entrada de su fila cuya columna es la elegida
+        hit = (index[row, :k] == col[:, None]).argmax(axis=1)
+        order = np.lexsort((data[row, hit], owner[row]))      # por VQC, mejor score (menor peso) primero
+        pois = poi_of[col[order]].tolist()
+        out, start = [], 0
+        for n in np.bincount(owner[row], minlength=n_vqc).tolist():
+            out.append(pois[start:start + n])
+            start += n
+        return out
+
+    def _candidates(self, pend: np.ndarray, vqc_xy: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Los k PoIs pendientes de mayor score de cada VQC: (índices V×k, scores V×k)."""
+        coords, urgency = self.coords, self.urgency
+        urg = urgency[pend]
+        if k >= len(pend):
+            # Todos son candidatos: puntuar la matriz completa sale más barato que los árboles
+            dist = np.hypot(*(vqc_xy[:, None, :] - coords[pend][None, :, :]).transpose(2, 0, 1))
+            return np.broadcast_to(pend, dist.shape), urg / np.maximum(dist, 1e-6)
+        cand, score = [], []
+        for level in np.flatnonzero(np.bincount(urg)).tolist():
+            sel = pend[urg == level]
+            kk = min(k, len(sel))
+            dist, near = self._tree(level, sel).query(vqc_xy, k=kk)
+            if kk == 1:
+                dist, near = dist[:, None], near[:, None]
+            cand.append(sel[near])
+            score.append(level / np.maximum(dist, 1e-6))
+        cand, score = np.hstack(cand), np.hstack(score)
+        if cand.shape[1] > k:
+            top = np.argpartition(score, -k, axis=1)[:, -k:]
+            rows = np.arange(len(cand))[:, None]
+            cand, score = cand[rows, top], score[rows, top]
+        return cand, score
+
+    def _tree(self, level: int, sel: np.ndarray) -> cKDTree:
+        """Árbol de los pendientes de un nivel; se reconstruye sólo si ese nivel cambió."""
+        cached = self._trees.get(level)
+        if cached is not None and np.array_equal(cached[0], sel):
+            return cached[1]
+        # Sin equilibrar ni compactar se construye antes (con reparto continuo se reconstruye a menudo)
+        tree = cKDTree(self.coords[sel], balanced_tree=False, compact_nodes=False)
+        self._trees[level] = (sel, tree)
+        return tree
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tiempo y calidad de la asignación optimal_batch")
+    parser.add_argument('--vqcs', type=int, default=50)
+    parser.add_argument('--pending', type=int, default=1000)
+    parser.add_argument('--cap', type=int, default=3, help='Huecos por VQC')
+    parser.add_argument('--candidates', type=int, default=2, help='Candidatos por hueco (BATCH_CANDIDATES)')
+    parser.add_argument('--area', type=float, default=50.0)
+    parser.add_argument('--repeats', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    coords = rng.uniform(0, args.area, (args.pending, 2))
+    urgency = rng.integers(1, 4, args.pending).astype(np.int8)
+    xy = [(float(x), float(y)) for x, y in coords]
+    vqc_xy = [tuple(p) for p in rng.uniform(0, args.area, (args.vqcs, 2))]
+    caps = [args.cap] * args.vqcs
+    pending = list(range(args.pending))
+
+    def total(alloc) -> float:
+        return sum(urgency[i] / max(1e-6, math.dist(vqc_xy[v], xy[i])) for v, idx in enumerate(alloc) for i in idx)
+
+    def timed(pendings) -> np.ndarray:
+        times = []
+        gc.disable()                                            # sin pausas del recolector dentro de la medida
+        for p in pendings:
+            t0 = time.perf_counter()
+            solver.solve(p, vqc_xy, caps, args.candidates)
+            times.append(time.perf_counter() - t0)
+        gc.enable()
+        return np.array(times) * 1e3
+
+    solver = BatchAssigner(coords, urgency)
+    alloc = solver.solve(pending, vqc_xy, caps, args.candidates)
+    # Mismos pendientes (árboles reutilizados) y pendientes distintos en cada resolución
+    # (sin un PoI por nivel, alternando: se reconstruyen todos los árboles)
+    same = timed([pending] * args.repeats)
+    changed = timed([pending[r % 2 * 3:] for r in range(args.repeats)])
+
+    greedy, store = [], PendingStore(xy, urgency)
+    for i in pending:
+        store.add(i)
+    for v in range(args.vqcs):
+        picks = [i for _, i in store.top_k(*vqc_xy[v], args.cap)]
+        for i in picks:
+            store.discard(i)
+        greedy.append(picks)
+    exact = solver.solve(pending, vqc_xy, caps, args.pending)
+
+    print(f"{args.vqcs} VQCs × {args.pending} PoIs pendientes, {args.cap} huecos por VQC")
+    ok = True
+    for name, times in (("mismos pendientes", same), ("pendientes cambiados", changed)):
+        med = float(np.median(times))
+        ok = ok and med <= BUDGET_MS
+        print(f"  solve ({name}): mediana {med:.3f} ms, p90 {np.percentile(times, 90):.3f} ms, "
+              f"máx {times.max():.3f} ms → {'✅ PASS' if med <= BUDGET_MS else '❌ FAIL'} (mediana <= {BUDGET_MS} ms)")
+    print(f"  score total: batch {total(alloc):.2f}, greedy secuencial {total(greedy):.2f}, "
+          f"exacto (K = todos los huecos) {total(exact):.2f}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,44 @@
+"""
+bench_allocation.py
+Centralized E-QC policies against the distributed bundle auction (auction.py):
+- Runs the same scenario (seed, PoIs, buffer, speed, camera) headless at
+  5, 20 and 100 V-QCs for every policy.
+- Reports messages sent (total and per simulated second), bytes sent,
+  allocation latency (detection → first ASSIGN or auction commitment) and
+  duplicate auction commitments, plus delivered PoIs and global score (in
+  auction mode every announced PoI counts as assigned, so "entregas" is not
+  comparable one to one with the central policies).
+"""
+import argparse
+import logging
+
+from run_simulation import RunParams, run
+
+POLICIES = ["load_balancing", "greedy", "optimal_batch", "auction"]
+BYTE_FIELDS = ["hello_bytes", "hello_ack_bytes", "assign_bytes", "deliver_bytes",
+               "deliver_ack_bytes", "announce_bytes", "bid_bytes"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mensajes y latencia de asignación: políticas centrales vs subasta")
+    parser.add_argument('--vqcs', type=int, nargs='+', default=[5, 20, 100])
+    parser.add_argument('--policies', nargs='+', default=POLICIES, choices=POLICIES)
+    parser.add_argument('--seed', type=int, default=100)
+    parser.add_argument('--num_pois', type=int, default=100)
+    parser.add_argument('--buffer_size', type=int, default=5)
+    parser.add_argument('--speed', type=float, default=5.0)
+    parser.add_argument('--camera_reach', type=float, default=15.0)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'VQCs':>5} {'política':<15} {'msgs':>7} {'msgs/s':>7} {'bytes':>9} "
+          f"{'asign. (s)':>10} {'duplic.':>7} {'entregas':>8} {'score':>6}")
+    for n in args.vqcs:
+        for policy in args.policies:
+            m = run(RunParams(seed=args.seed, num_pois=args.num_pois, num_vqcs=n,
+                              buffer_size=args.buffer_size, speed=args.speed,
+                              camera_reach=args.camera_reach, headless=True,
+                              wire_format="object", assignment_policy=policy))
+            sent = sum(getattr(m, f) for f in BYTE_FIELDS)
+            print(f"{n:>5} {policy:<15} {m.messages_sent:>7} {m.messages_sent / m.sim_time:>7.1f} {sent:>9} "
+                  f"{m.alloc_latency:>10.2f} {m.alloc_duplicates:>7} {m.assign_success:>8} {m.global_score:>6.1f}")
@@ -0,0 +1,103 @@
+"""
+bench_camera.py
+Benchmark of the vectorized CameraSensor against gradysim's CameraHardware:
+- Builds a gradysim simulation with N static PoI nodes on the ground
+  (default 1k, 10k and 100k) and one camera node flying over them.
+- Times take_picture() and CameraSensor.visible() from the same position and
+  checks that both see exactly the same PoIs, for the E-QC camera
+  (theta=180, facing down) and for a narrow oblique cone.
+"""
+import argparse
+import logging
+import random
+import time
+from typing import List
+
+from gradysim.protocol.interface import IProtocol
+from gradysim.simulator.extension.camera import CameraHardware, CameraConfiguration
+from gradysim.simulator.handler.mobility import MobilityHandler
+from gradysim.simulator.handler.timer import TimerHandler
+from gradysim.simulator.simulation import SimulationBuilder, SimulationConfiguration
+
+from camera_sensor import CameraSensor
+
+CONFIGS = {
+    "eqc (theta=180)": dict(camera_reach=15.0, camera_theta=180.0, facing_elevation=180.0, facing_rotation=0.0),
+    "cono 30° oblicuo": dict(camera_reach=15.0, camera_theta=30.0, facing_elevation=135.0, facing_rotation=45.0),
+}
+
+
+class _Static(IProtocol):
+    def initialize(self): pass
+    def handle_telemetry(self, telemetry): pass
+    def handle_timer(self, timer): pass
+    def handle_packet(self, message): pass
+    def finish(self): pass
+
+
+class _Camera(_Static):
+    """Nodo cámara: mide ambas implementaciones en su primer timer."""
+    points: List = []
+    repeats = 1
+    results = {}
+
+    def initialize(self):
+        self.provider.schedule_timer("shot", self.provider.current_time())
+
+    def handle_timer(self, timer):
+        pos = self.provider.node.position
+        for name, cfg in CONFIGS.items():
+            camera = CameraHardware(self, CameraConfiguration(**cfg))
+            sensor = CameraSensor(self.points, CameraConfiguration(**cfg))
+
+            t0 = time.perf_counter()
+            for _ in range(self.repeats):
+                detected = camera.take_picture()
+            t_hw = (time.perf_counter() - t0) / self.repeats
+
+            t0 = time.perf_counter()
+            for _ in range(self.repeats):
+                idx = sensor.visible(pos)
+            t_vec = (time.perf_counter() - t0) / self.repeats
+
+            seen_hw = sorted(tuple(d["position"][:2]) for d in detected)
+            seen_vec = sorted(tuple(self.points[i]) for i in idx)
+            self.results[name] = (t_hw, t_vec, len(seen_vec), seen_hw == seen_vec)
+
+
+def bench(n: int, area: float, repeats: int, seed: int = 0):
+    rng = random.Random(seed)
+    points = [(rng.uniform(0, area), rng.uniform(0, area)) for _ in range(n)]
+    _Camera.points, _Camera.repeats, _Camera.results = points, repeats, {}
+
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    try:
+        builder = SimulationBuilder(SimulationConfiguration(duration=0.001, execution_logging=False))
+        builder.add_node(_Camera, (area / 2, area / 2, 7.0))
+        for x, y in points:
+            builder.add_node(_Static, (x, y, 0.0))
+        builder.add_handler(TimerHandler())
+        builder.add_handler(MobilityHandler())
+        builder.build().start_simulation()
+    finally:
+        # gradysim añade un handler de consola al logger raíz por simulación
+        for h in root.handlers[:]:
+            if h not in handlers:
+                root.removeHandler(h)
+        root.setLevel(level)
+    return _Camera.results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CameraSensor vs CameraHardware.take_picture")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000], help='Nº de PoIs')
+    parser.add_argument('--area', type=float, default=50.0, help='Lado del área (m)')
+    parser.add_argument('--repeats', type=int, default=5, help='Fotos por medida')
+    args = parser.parse_args()
+
+    print(f"{'PoIs':>8}  {'cámara':<18} {'take_picture':>13} {'CameraSensor':>13} {'speedup':>8} {'vistos':>7}  iguales")
+    for n in args.sizes:
+        for name, (t_hw, t_vec, seen, same) in bench(n, args.area, args.repeats).items():
+            print(f"{n:>8}  {name:<18} {t_hw * 1e3:>10.2f} ms {t_vec * 1e3:>10.3f} ms "
+                  f"{t_hw / t_vec:>7.0f}x {seen:>7}  {same}")
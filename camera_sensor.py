@@ -0,0 +1,61 @@
+"""
+Vectorized camera sensor over the PoI coordinate array:
+- Same detection model as gradysim's CameraHardware: a cone with its apex at
+  the camera, length camera_reach, half-angle camera_theta, pointing along
+  facing_elevation / facing_rotation.
+- visible(position) runs the reach and cone test over every PoI in one NumPy
+  pass and returns PoI indices directly (no dicts to match back to PoIs).
+- Used by the E-QC for the passive PoI layer; bench_camera.py compares it
+  with CameraHardware.take_picture.
+"""
+import math
+from typing import Sequence
+
+import numpy as np
+
+from gradysim.simulator.extension.camera import CameraConfiguration
+
+
+class CameraSensor:
+    """Cámara sobre un conjunto fijo de puntos (P×2 a ras de suelo, o P×3)."""
+
+    def __init__(self, points, configuration: CameraConfiguration):
+        pts = np.asarray(points, dtype=np.float64).reshape(len(points), -1)
+        self._x = np.ascontiguousarray(pts[:, 0])
+        self._y = np.ascontiguousarray(pts[:, 1])
+        self._z = np.ascontiguousarray(pts[:, 2]) if pts.shape[1] > 2 else None   # None: z = 0
+        self._configuration = configuration
+        self._camera_vector = self._direction()
+
+    def _direction(self):
+        elev = math.radians(self._configuration.facing_elevation)
+        rot = math.radians(self._configuration.facing_rotation)
+        return math.sin(elev) * math.cos(rot), math.sin(elev) * math.sin(rot), math.cos(elev)
+
+    def change_facing(self, facing_elevation: float, facing_rotation: float) -> None:
+        self._configuration.facing_elevation = facing_elevation
+        self._configuration.facing_rotation = facing_rotation
+        self._camera_vector = self._direction()
+
+    def visible(self, position: Sequence[float]) -> np.ndarray:
+        """Índices (crecientes) de los puntos dentro del cono de la cámara en `position`."""
+        px, py, pz = position
+        reach = self._configuration.camera_reach
+        dx = self._x - px
+        dy = self._y - py
+        dz = -pz if self._z is None else self._z - pz
+        d2 = dx * dx + dy * dy + dz * dz
+        idx = np.flatnonzero(d2 <= reach * reach)
+
+        theta = math.radians(self._configuration.camera_theta)
+        if theta >= math.pi or not len(idx):
+            return idx          # cono de 180° o más: el alcance basta
+
+        # Test del ángulo sólo sobre los que están al alcance
+        cx, cy, cz = self._camera_vector
+        dist = np.sqrt(d2[idx])
+        dzi = dz if self._z is None else dz[idx]
+        dot = cx * dx[idx] + cy * dy[idx] + cz * dzi
+        with np.errstate(invalid="ignore", divide="ignore"):
+            angle = np.arccos(np.clip(dot / dist, -1.0, 1.0)) - 1e-6   # misma tolerancia que gradysim
+        return idx[(dist == 0) | (angle <= theta)]
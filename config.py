@@ -16,14 +16,39 @@ R_CAMERA = 15
 R_DETECT = 8.0            
 R_COMM = 10.0              
 POIS: List[Dict] = []   
+POI_AS_NODES = False             # True: un nodo POIProtocol por PoI (validación); False: capa pasiva
+POI_NODES: Dict[int, int] = {}   # node id de cada POIProtocol → índice en POIS
+COORD_MATCH_EPS = 0.2            # tolerancia (m) al resolver una detección de cámara a un PoI
+CAMERA_SCHEDULE = False          # True: el EQC detecta por calendario de visibilidad (visibility_schedule.py)
+WIRE_FORMAT = "binary"           # formato de los mensajes: "binary" (wire.py), "json" (depuración) u "object" (sin serializar)
+WIRE_STRICT = False              # modo "object": comprobar que cada mensaje sobrevive al formato binario
 
 # Buffer and duration
 M = 5                    
 DURATION = 35          
 NUM_VQCS = 5              
 MAX_ASSIGN_PER_ENCOUNTER = 3
+ASSIGNMENT_POLICY = "load_balancing"  # "greedy", "round_robin", "load_balancing", "optimal_batch" (batch_assignment.py) o "auction" (auction.py)
+BATCH_CANDIDATES = 2             # optimal_batch: PoIs candidatos por hueco de cada VQC
+AUCTION_PERIOD = 0.5             # auction: s entre rondas de puja (BID) de cada VQC
+AUCTION_HEARTBEAT = 2.0          # auction: s máximos entre dos BID aunque la tabla no cambie
+AUCTION_SETTLE = 1.0             # auction: s que una puja debe seguir ganando antes de volar al PoI
+AUCTION_DONE_TTL = 3.0           # auction: s que se difunde un PoI ya descubierto antes de olvidarlo
 EQC_SPEED = 10.0               
+EQC_WP_TOLERANCE = 1.0           # distancia (m) a la que el EQC da un waypoint por alcanzado
 VQC_SPEED = 25.0    
+ROUTE_PLANNER = "2opt"           # orden de next2visit: "2opt" (route_planner.py) u "arrival" (orden de llegada)
+RENDEZVOUS = False               # True: volver al EQC a entregar en cuanto discovered se llena o tiene un PoI urgente
+RENDEZVOUS_URGENCY = 3           # urgencia a partir de la cual un PoI descubierto dispara la vuelta
+RELAY = False                    # True: ceder el buffer de PoIs descubiertos a un VQC vecino que llegue antes al EQC
+RELAY_MARGIN = 0.1               # s de ETA al EQC que el vecino debe ganar para aceptar el relevo (< una fila de la V)
+RELAY_MIN_ETA = 3.0              # s de ETA por debajo de los cuales un VQC no ofrece su buffer (ya llega)
+SAT_DRIFT_THRESHOLD = 2.0        # desvío (m) tolerado en modo satélite antes de replanificar
+
+# Periodo (s) de telemetría por tipo de nodo: 0 = en cada actualización de movilidad (0.01 s), None = nunca
+EQC_TELEMETRY_PERIOD = 0.0
+VQC_TELEMETRY_PERIOD = 0.0
+POI_TELEMETRY_PERIOD = None      # los POIProtocol ignoran la telemetría
 
 
 # Métricas globales
@@ -4,11 +4,20 @@ Exploration Quadcopter (E-QC) protocol:
 - Captures and filters PoI detections.
 - Coordinates with V-QCs by sending ASSIGN messages.
 - Limits total ASSIGNs per physical encounter (not per timer tick)
+- PoIs are registry indices throughout; per-PoI state lives in NumPy arrays
+  (detection/assignment times, delivered bitset) and labels are only looked
+  up for logs and the final report.
+- Assignment policy from config.ASSIGNMENT_POLICY; "optimal_batch" assigns to
+  every VQC in range at once (batch_assignment.py) and reports its solve time.
+  With "auction" the E-QC only broadcasts the PoIs nobody has won yet
+  (ANNOUNCE) and the V-QCs allocate them among themselves (auction.py).
+- Relay mode (config.RELAY): PoIs handed between V-QCs arrive in
+  RELAY_DELIVER with their original discoverer, who is the one credited.
 """
 
-import json                                                   
 import math                                                  
 import logging
+import time
 from typing import List
 from collections import Counter        #
 
@@ -21,13 +30,22 @@ from gradysim.simulator.extension.camera import CameraHardware, CameraConfigurat
 import config
 from config import MAX_ASSIGN_PER_ENCOUNTER
 from config import EQC_WAYPOINTS 
+from poi_registry import registry
+from wire import WireCodec
+from camera_sensor import CameraSensor
+from trajectory import eqc_trajectory
+from visibility_schedule import VisibilitySchedule
+from pending_store import PendingStore
+from batch_assignment import BatchAssigner
+from auction import MAX_ENTRIES, NO_WINNER
 class EQCProtocol(IProtocol):
 
     def initialize(self) -> None:
         self.id = self.provider.get_id()
         self.log = logging.getLogger(f"EQC-{self.id}")
+        self.wire = WireCodec(config.WIRE_FORMAT, config.WIRE_STRICT)     # codec de mensajes (binario, JSON u objetos)
         self.log.info(f"Current handlers: s{self.log.handlers}")
-        self.assignment_policy = "load_balancing" # or "round_robin" or "load_balancing"  greedy
+        self.assignment_policy = config.ASSIGNMENT_POLICY   # greedy, round_robin, load_balancing u optimal_batch
         self.encounter_assigned = {vid: 0 for vid in range(config.NUM_VQCS)}
         self.last_hello_time = {}
 
@@ -39,7 +57,7 @@ class EQCProtocol(IProtocol):
         cfg = MissionMobilityConfiguration(
             speed=config.EQC_SPEED,
             loop_mission=LoopMission.RESTART,
-            tolerance=1
+            tolerance=config.EQC_WP_TOLERANCE
         )
         self.mission = MissionMobilityPlugin(self, cfg)
         self.mission.start_mission(waypoints)
@@ -49,12 +67,19 @@ class EQCProtocol(IProtocol):
         self.assign_count      = 0                # total ASSIGNs enviadas
         self.assign_success    = 0
         self.global_score      = 0                # PoIs de ASSIGN que efectivamente se entregaron
-        self.assign_times      = {}               # mapa poi_label → t_assign
-        self.latencies         = []               # lista de (label, latency)
+        reg = registry()
+        self.assign_times      = reg.times()      # por PoI: t_assign (NaN = sin ASSIGN pendiente)
+        self.latencies         = []               # lista de (índice del PoI, latency)
         self.coverage_timeline = []               # lista de (elapsed_time, unique_count)
         self.redundant_delivers = 0
-        config.METRICS["unique_ids"]  = set()
+        self.assign_solve_ms   = []               # optimal_batch: ms de cada resolución
+        self.alloc_latencies   = []               # (índice del PoI, detección → ASSIGN en s); con subasta, en los VQCs
+        self.announced         = reg.flags()      # auction: PoIs ya anunciados alguna vez
+        self.credited          = Counter()        # VQC descubridor → PoIs nuevos entregados (propios o por relevo)
+        self.relayed_delivered = 0                # PoIs nuevos llegados por RELAY_DELIVER
+        config.METRICS["unique_ids"]  = reg.flags()   # bitset de PoIs auto-entregados
         config.METRICS["redundant"]   = 0
+        self.unique_count      = 0                # PoIs marcados en METRICS["unique_ids"]
 
 
         self.cam_raw_count     = 0   # cada nodo detectado por take_picture()
@@ -73,12 +98,28 @@ class EQCProtocol(IProtocol):
             facing_elevation=180.0,
             facing_rotation=0.0
         )
-        self.camera = CameraHardware(self, cam_cfg)
+        self.camera = CameraHardware(self, cam_cfg)               # nodos (VQCs, PoIs con POI_AS_NODES)
+        self.sensor = CameraSensor(registry().coords, cam_cfg)   # PoIs de la capa pasiva
         self.log.info(f"📷 Camera configured: reach={config.R_CAMERA}, theta={cam_cfg.camera_theta}")
 
+        # Calendario de visibilidad de la patrulla: cobertura siempre; detección sólo con CAMERA_SCHEDULE
+        self.schedule = VisibilitySchedule(eqc_trajectory(), reg.coords, config.R_CAMERA, config.DURATION)
+        self.never_covered = self.schedule.never_covered
+        if len(self.never_covered):
+            self.log.warning(f"🕳️ {len(self.never_covered)} PoIs fuera del alcance de la patrulla: "
+                             f"{[reg.labels[i] for i in self.never_covered]}")
+        self.use_schedule = config.CAMERA_SCHEDULE
+        if self.use_schedule and cam_cfg.camera_theta < 180.0:
+            self.log.warning("📅 Calendario sólo válido con camera_theta >= 180 → se usan fotos")
+            self.use_schedule = False
+        self._last_shot = -1.0
+
         # Estados internos
-        self.pending: List[dict] = []
-        self.detect_ts: dict = {}
+        # PoIs detectados sin asignar (borrado O(1), top-k por urgencia/distancia)
+        self.pending = PendingStore(reg.xy, reg.urgency)
+        # optimal_batch: árboles de pendientes por urgencia, reutilizados entre resoluciones
+        self.batch = BatchAssigner(reg.coords, reg.urgency) if self.assignment_policy == "optimal_batch" else None
+        self.detect_ts = reg.times()              # por PoI: instante de detección (NaN = no visto)
         self.vqc_states: dict = {}
 
         # Programar muestreo de detección y asignación cada 1s
@@ -90,6 +131,7 @@ class EQCProtocol(IProtocol):
     def handle_telemetry(self, telemetry: Telemetry) -> None: # lo que hace es imprimir posicion y a que waypoint se dirige
         self.log.debug(f"📡 Telemetry: pos={telemetry.current_position}, idle={self.mission.is_idle}")
         self.pos = telemetry.current_position
+        self.pos_time = self.provider.current_time()  # instante de la muestra (con telemetría espaciada, atrasa)
         if not self.mission.is_idle:
             wp = self.mission.current_waypoint
             self.log.debug(f"🛰️ EQC moving towards waypoint {wp}")
@@ -106,10 +148,24 @@ class EQCProtocol(IProtocol):
             self.log.info("*"*40 + f" t={now:.2f}s " + "*"*40)
             ########
             self.log.info(f"⚙️  EQC handle_timer('assign') @ t={now:.2f}")
-            detected = self.camera.take_picture()
+            # Nodos a la vista (VQCs, y los PoIs si config.POI_AS_NODES)
+            if self.use_schedule:
+                # Sin foto: PoIs que entraron al alcance desde el tick anterior
+                detected = []
+                hits = self.schedule.between(self._last_shot, now).tolist()
+                raw = len(hits)
+            elif config.POI_AS_NODES:
+                detected = self.camera.take_picture()
+                hits = self._match_detections(detected)
+                raw = len(detected)
+            else:
+                detected = self.camera.take_picture()
+                hits = self._pictured_pois()
+                raw = len(detected) + len(hits)
+            self._last_shot = now
             # Métrica raw
-            self.cam_raw_count += len(detected)
-            self.log.info(f"⚙️  assign @ t={now:.2f}: {len(detected)} nodos detectados")
+            self.cam_raw_count += raw
+            self.log.info(f"⚙️  assign @ t={now:.2f}: {raw} nodos detectados")
 
             # Log raw detections
             #for node in detected:
@@ -118,38 +174,20 @@ class EQCProtocol(IProtocol):
             # Log raw detections (agrupados)
             self._log_raw_detections(detected)
 
-            # Filtrar PoIs
-            new_cnt = 0
-            eps = 0.2
-            for poi in config.POIS:
-                px, py = poi["coord"]
-                for node in detected:
-                    #self.log.debug(f"   Raw node: {node!r}")
-                    x, y, z = node["position"]
-                    if abs(x-px)<eps and abs(y-py)<eps and abs(z-0.0)<eps:
-                        # Métrica de match válido
-                        label = poi["label"]
-                        if label not in self.detect_ts:
-                            self.cam_poi_matches += 1
-                            self.detect_ts[label] = now
-                            self.pending.append(poi)
-                            new_cnt += 1
-                            self.log.info(f"🔍 {label} detectado @ {poi['coord']} t={now:.2f}")
-                        break
-            #for node in detected:
-            #    self.log.debug(f"   Raw node: {node!r}")
-            #    pid = node.get("id")
-            #    if pid and pid not in self.detect_ts:
-            #        # es un PoI nuevo
-            #        self.cam_poi_matches += 1
-            #        self.detect_ts[pid] = now
-            #        # busco el objeto completo en POIS
-            #        poi = next(p for p in POIS if p.get("label")==pid or p.get("id")==pid)
-            #        self.pending.append(poi)
-            #        new_cnt += 1
-            #        self.log.info(f"🔍 {pid} detectado @ {poi['coord']} t={now:.2f}")
+            # PoIs vistos por primera vez (hits ya viene en orden creciente)
+            reg = registry()
+            new = [i for i in hits if math.isnan(self.detect_ts[i])]
+            self.detect_ts[new] = now
+            for idx in new:
+                self.pending.add(idx)
+            self.cam_poi_matches += len(new)
+            new_cnt = len(new)
+            for idx in new:
+                self.log.info(f"🔍 {reg.labels[idx]} detectado @ {reg.xy[idx]} t={now:.2f}")
 
             self.log.debug(f"🗂️ pending size /relacionado con new_cnt: {len(self.pending)} (+{new_cnt})")
+            if self.assignment_policy == "auction":
+                self._announce(now)
 
             # Reprogramar
             next_t = now + 1
@@ -158,9 +196,17 @@ class EQCProtocol(IProtocol):
 
     def handle_packet(self, message: str) -> None: #se activa con HELLO o deliver, actualiza vqc states, pendindg      y en deliver
         self.log.debug(f"📥 [RAW] handle_packet recibido: {message}")
-        msg = json.loads(message)
+        msg = self.wire.decode(message)
         t = msg.get("type")
         vid = msg["v_id"]
+        if t == "BID":
+            # Subasta entre VQCs: los PoIs con ganador dejan de anunciarse
+            for b in msg["bids"]:
+                if b["winner"] != NO_WINNER:
+                    self.pending.discard(b["idx"])
+            return
+        if t == "RELAY_OFFER":
+            return              # relevo entre VQCs: el EQC no participa
         # Si aún no tenemos estado de este VQC y el mensaje no es HELLO, lo ignoramos
         if t != "HELLO" and vid not in self.vqc_states:
             self.log.warning(f"Ignorando {t} de VQC-{vid} (no hay HELLO previo)")
@@ -183,71 +229,77 @@ class EQCProtocol(IProtocol):
             if free <= 0:
                     self.log.debug(f"→ VQC-{vid} buffer FULL tras assign")
 
-            ack = {"type": "HELLO_ACK", "v_id": vid,"eqc_pos": list(self.pos), "eqc_time": self.provider.current_time()}
+            ack = {"type": "HELLO_ACK", "v_id": vid,"eqc_pos": list(self.pos), "eqc_time": self.pos_time}
             cmd_ack = CommunicationCommand(
                 CommunicationCommandType.SEND,
-                json.dumps(ack),
+                self.wire.encode(ack),
                 vid
             )
             self.provider.send_communication_command(cmd_ack)
             self.log.info(f"📣 EQC envió HELLO_ACK a VQC-{vid}")
 
-        elif t == "DELIVER":
+        elif t in ("DELIVER", "RELAY_DELIVER"):
             self._executed["handle_packet.DELIVER"] = True
             now = self.provider.current_time()
             vid = msg["v_id"]
-            delivered = msg.get("pids", [])  
-            self.log.info(f"📥 DELIVER from VQC-{vid}: {delivered}")
-            for entry in delivered:
-                label = entry.get("label")
-                poi_id = entry.get("id")
-                if label is None or poi_id is None:
-                    self.log.warning(f"DELIVER malformed: {entry!r}")
-                    continue
-                t0 = self.assign_times.pop(label, None)
-                if t0 is not None:
+            if t == "DELIVER":
+                delivered = msg.get("pids", [])
+                origins = [vid] * len(delivered)
+            else:
+                # Relevo: se acredita al VQC que descubrió cada PoI
+                delivered = [e["idx"] for e in msg["items"]]
+                origins = [e["origin"] for e in msg["items"]]
+            reg = registry()
+            self.log.info(f"📥 {t} from VQC-{vid}: {[reg.ids[i] for i in delivered]}")
+            unique = config.METRICS["unique_ids"]
+            for idx, origin in zip(delivered, origins):
+                if not unique[idx] or not math.isnan(float(self.assign_times[idx])):
+                    self.credited[origin] += 1
+                    if t == "RELAY_DELIVER":
+                        self.relayed_delivered += 1
+                t0 = float(self.assign_times[idx])
+                if not math.isnan(t0):
+                    self.assign_times[idx] = math.nan
                     latency = now - t0
-                    self.latencies.append((label, latency))
+                    self.latencies.append((idx, latency))
                     self.assign_success += 1
-                    poi = next(p for p in config.POIS if p["label"] == label or p["id"] == poi_id)
-                    w = config.URGENCY_WEIGHTS.get(poi["urgency"], 0)
+                    w = config.URGENCY_WEIGHTS.get(int(reg.urgency[idx]), 0)
                     self.global_score += w                    
-                elif label not in config.METRICS["unique_ids"]:
-                    config.METRICS["unique_ids"].add(label)
-                    self.log.debug(f"ℹ️ First auto‐deliver for {label}")
+                elif not unique[idx]:
+                    unique[idx] = True
+                    self.unique_count += 1
+                    self.log.debug(f"ℹ️ First auto‐deliver for {reg.labels[idx]}")
                 else:
                     self.redundant_delivers += 1
                     config.METRICS["redundant"] += 1
-                    self.log.debug(f"⚠️ Redundant DELIVER for {label}")
+                    self.log.debug(f"⚠️ Redundant DELIVER for {reg.labels[idx]}")
 
                 # 2) Métrica de cobertura
                 elapsed = now - self.start_time
-                self.coverage_timeline.append((elapsed, len(config.METRICS["unique_ids"])))
-
-            self.log.debug(f"🧮 Metrics: unique={len(config.METRICS['unique_ids'])}, redundant={config.METRICS['redundant']}")
-            delivered_labels = [e["label"] for e in delivered]
-            self.log.debug(f"DELIVER recibido de VQC-{vid}: {delivered_labels}")
-            self.pending =[
-                p for p in self.pending
-                if p["label"] not in delivered_labels
-            ]
+                self.coverage_timeline.append((elapsed, self.unique_count))
+
+            self.log.debug(f"🧮 Metrics: unique={self.unique_count}, redundant={config.METRICS['redundant']}")
+            self.log.debug(f"DELIVER recibido de VQC-{vid}: {[reg.labels[i] for i in delivered]}")
+            for idx in delivered:
+                self.pending.discard(idx)
             # 2) Enviar ACK de entrega SOLO a ese V-QC
             ack_payload = {
                 "type": "DELIVER_ACK",
                 "v_id": vid,
-                "pids": [entry["id"] for entry in delivered]
+                "pids": list(delivered)
             }
             cmd_ack = CommunicationCommand(
                 CommunicationCommandType.SEND,
-                json.dumps(ack_payload),
+                self.wire.encode(ack_payload),
                 vid
             )
             self.provider.send_communication_command(cmd_ack)
-            self.log.info(f"📣 Enviado DELIVER_ACK a VQC-{vid}: {ack_payload['pids']}")
+            self.log.info(f"📣 Enviado DELIVER_ACK a VQC-{vid}: {[reg.ids[i] for i in delivered]}")
 
 
 
-            self.assign_to_vqcs()
+            if t == "DELIVER":
+                self.assign_to_vqcs()
 
     def assign_to_vqcs(self) -> None:
         if self.assignment_policy == "greedy":
@@ -256,6 +308,10 @@ class EQCProtocol(IProtocol):
             self._assign_round_robin()
         elif self.assignment_policy == "load_balancing":
             self._assign_load_balancing()
+        elif self.assignment_policy == "optimal_batch":
+            self._assign_optimal_batch()
+        elif self.assignment_policy == "auction":
+            self.log.debug("→ auction: el reparto lo hacen los VQCs")
         else:
             self.log.error(f"Unknown assignment policy: {self.assignment_policy}")
 
@@ -271,37 +327,26 @@ class EQCProtocol(IProtocol):
                 self.log.debug(f"→ VQC-{vid} no free slots / {MAX_ASSIGN_PER_ENCOUNTER} reached")
                 continue
 
-            scored = []
-            for poi in self.pending:
-                dist = max(1e-6, math.hypot(pos[0] - poi["coord"][0], pos[1] - poi["coord"][1]))
-                score = poi["urgency"] / dist
-                scored.append((score, poi))
-                self.log.debug(f"    ⋅ {poi['label']} urg={poi['urgency']} dist={dist:.2f} score={score:.2f}")
-
-            scored.sort(key=lambda x: x[0], reverse=True)
             remaining = MAX_ASSIGN_PER_ENCOUNTER - self.encounter_assigned.get(vid, 0)
             limit = min(free, remaining)
-            to_assign = [p for _, p in scored[:limit]]
+            to_assign = self._best_pending(pos, limit)
             if not to_assign:
                 self.log.debug(f"→ No PoIs for VQC-{vid}")
                 continue
 
-            for p in to_assign:
-                self.assign_times[p["label"]] = now
-                self.pending.remove(p)
-            self.assign_count += len(to_assign)
+            self._mark_assigned(to_assign, now)
 
             payload = {
                 "type": "ASSIGN", "v_id": vid,
-                "pois": [{"label": p["label"], "coord": p["coord"], "urgency": p["urgency"], "ts": self.detect_ts[p["label"]]} for p in to_assign]
+                "pois": [{"idx": p, "ts": float(self.detect_ts[p])} for p in to_assign]
             }
             self.log.debug(f"🚀 ASSIGN payload for VQC-{vid} (Greedy): {payload}")
 
-            cmd = CommunicationCommand(CommunicationCommandType.SEND, json.dumps(payload), vid)
+            cmd = CommunicationCommand(CommunicationCommandType.SEND, self.wire.encode(payload), vid)
             self.provider.send_communication_command(cmd)
             self.encounter_assigned[vid] += len(to_assign)
 
-            self.log.info(f"🚀 ASSIGN {len(to_assign)} to VQC-{vid}: {[p['label'] for p in to_assign]}")
+            self.log.info(f"🚀 ASSIGN {len(to_assign)} to VQC-{vid}: {[registry().labels[p] for p in to_assign]}")
             self.vqc_states[vid]["huecos"] -= len(to_assign)
 
     ########### editar aqui ###########
@@ -335,22 +380,19 @@ class EQCProtocol(IProtocol):
                 self.log.debug("→ No PoIs pending")
                 break
 
-            to_assign = [self.pending[0]]  # Solo un PoI por ronda
+            to_assign = [self.pending.first()]  # Solo un PoI por ronda
 
-            for p in to_assign:
-                self.assign_times[p["label"]] = now
-                self.pending.remove(p)
-            self.assign_count += len(to_assign)
+            self._mark_assigned(to_assign, now)
 
             payload = {
                 "type": "ASSIGN", "v_id": vid,
-                "pois": [{"label": p["label"], "coord": p["coord"], "urgency": p["urgency"], "ts": self.detect_ts[p["label"]]} for p in to_assign]
+                "pois": [{"idx": p, "ts": float(self.detect_ts[p])} for p in to_assign]
             }
             self.log.debug(f"🚀 ASSIGN payload for VQC-{vid} (Round-Robin): {payload}")
 
-            cmd = CommunicationCommand(CommunicationCommandType.SEND, json.dumps(payload), vid)
+            cmd = CommunicationCommand(CommunicationCommandType.SEND, self.wire.encode(payload), vid)
             self.provider.send_communication_command(cmd)
-            self.log.info(f"🚀 ASSIGN {len(to_assign)} to VQC-{vid}: {[p['label'] for p in to_assign]}")
+            self.log.info(f"🚀 ASSIGN {len(to_assign)} to VQC-{vid}: {[registry().labels[p] for p in to_assign]}")
 
             self.vqc_states[vid]["huecos"] -= len(to_assign)
             break  # Asigna solo 1 VQC por llamada (puedes cambiar esto)
@@ -387,65 +429,159 @@ class EQCProtocol(IProtocol):
             self.log.debug(f"→ VQC-{best_vid} no free slots o throttle alcanzado")
             return
 
-        scored = []
-        for poi in self.pending:
-            dist = max(1e-6, math.hypot(pos[0] - poi["coord"][0], pos[1] - poi["coord"][1]))
-            score = poi["urgency"] / dist
-            scored.append((score, poi))
-            self.log.debug(f"    ⋅ {poi['label']} urg={poi['urgency']} dist={dist:.2f} score={score:.2f}")
-
-        scored.sort(key=lambda x: x[0], reverse=True)
         remaining = MAX_ASSIGN_PER_ENCOUNTER - self.encounter_assigned.get(best_vid, 0)
         limit = min(free, remaining)
 
-        to_assign = [p for _, p in scored[:limit]]
+        to_assign = self._best_pending(pos, limit)
         if not to_assign:
             self.log.debug(f"→ No PoIs for VQC-{best_vid}")
             return
 
-        for p in to_assign:
-            self.assign_times[p["label"]] = now
-            self.pending.remove(p)
-        self.assign_count += len(to_assign)
+        self._mark_assigned(to_assign, now)
 
         payload = {
             "type": "ASSIGN", "v_id": best_vid,
-            "pois": [{"label": p["label"], "coord": p["coord"], "urgency": p["urgency"], "ts": self.detect_ts[p["label"]]} for p in to_assign]
+            "pois": [{"idx": p, "ts": float(self.detect_ts[p])} for p in to_assign]
         }
         self.log.debug(f"🚀 ASSIGN payload for VQC-{best_vid} (Load-Balancing): {payload}")
 
-        cmd = CommunicationCommand(CommunicationCommandType.SEND, json.dumps(payload), best_vid)
+        cmd = CommunicationCommand(CommunicationCommandType.SEND, self.wire.encode(payload), best_vid)
         self.provider.send_communication_command(cmd)
         self.encounter_assigned[best_vid] += len(to_assign)
 
-        self.log.info(f"🚀 ASSIGN {len(to_assign)} to VQC-{best_vid}: {[p['label'] for p in to_assign]}")
+        self.log.info(f"🚀 ASSIGN {len(to_assign)} to VQC-{best_vid}: {[registry().labels[p] for p in to_assign]}")
         self.vqc_states[best_vid]["huecos"] -= len(to_assign)
 
+    # Método para política Optimal-Batch: un único reparto para todos los VQCs
+    def _assign_optimal_batch(self) -> None:
+        now = self.provider.current_time()
+        self.log.debug(f"🔍 assign_to_vqcs (Optimal-Batch): pending={len(self.pending)}, states={self.vqc_states}")
+        vids, caps, xy = [], [], []
+        for vid, st in self.vqc_states.items():
+            remaining = MAX_ASSIGN_PER_ENCOUNTER - self.encounter_assigned.get(vid, 0)
+            cap = min(st["huecos"], remaining)
+            if cap > 0:
+                vids.append(vid)
+                caps.append(cap)
+                xy.append(st["pos"][:2])
+        if not vids or not self.pending:
+            self.log.debug("→ No VQCs con huecos o no PoIs pending")
+            return
+
+        reg = registry()
+        t0 = time.perf_counter()
+        alloc = self.batch.solve(self.pending, xy, caps, config.BATCH_CANDIDATES)
+        solve_ms = (time.perf_counter() - t0) * 1000
+        self.assign_solve_ms.append(solve_ms)
+        self.log.info(f"🧮 optimal_batch: {len(vids)} VQCs × {len(self.pending)} pendientes "
+                      f"→ {sum(map(len, alloc))} PoIs en {solve_ms:.3f} ms")
+
+        for vid, to_assign in zip(vids, alloc):
+            if not to_assign:
+                self.log.debug(f"→ No PoIs for VQC-{vid}")
+                continue
+            self._mark_assigned(to_assign, now)
+
+            payload = {
+                "type": "ASSIGN", "v_id": vid,
+                "pois": [{"idx": p, "ts": float(self.detect_ts[p])} for p in to_assign]
+            }
+            self.log.debug(f"🚀 ASSIGN payload for VQC-{vid} (Optimal-Batch): {payload}")
+
+            cmd = CommunicationCommand(CommunicationCommandType.SEND, self.wire.encode(payload), vid)
+            self.provider.send_communication_command(cmd)
+            self.encounter_assigned[vid] += len(to_assign)
+
+            self.log.info(f"🚀 ASSIGN {len(to_assign)} to VQC-{vid}: {[reg.labels[p] for p in to_assign]}")
+            self.vqc_states[vid]["huecos"] -= len(to_assign)
+
+    # Modo subasta: el EQC sólo anuncia lo que nadie ha ganado todavía
+    def _announce(self, now: float) -> None:
+        offered = list(self.pending)
+        if not offered:
+            return
+        # La primera vez que se anuncia un PoI cuenta como su ASSIGN (latencia, assigns_sent)
+        new = [p for p in offered if not self.announced[p]]
+        self.announced[new] = True
+        self.assign_times[new] = now
+        self.assign_count += len(new)
+        for i in range(0, len(offered), MAX_ENTRIES):
+            payload = {
+                "type": "ANNOUNCE", "v_id": self.id,
+                "pois": [{"idx": p, "ts": float(self.detect_ts[p])} for p in offered[i:i + MAX_ENTRIES]]
+            }
+            cmd = CommunicationCommand(CommunicationCommandType.BROADCAST, self.wire.encode(payload))
+            self.provider.send_communication_command(cmd)
+        self.log.info(f"📢 ANNOUNCE {len(offered)} PoIs sin ganador ({len(new)} nuevos)")
+
+    def _mark_assigned(self, to_assign: List[int], now: float) -> None:
+        for p in to_assign:
+            self.assign_times[p] = now
+            self.alloc_latencies.append((p, now - float(self.detect_ts[p])))
+            self.pending.discard(p)
+        self.assign_count += len(to_assign)
+
     def finish(self) -> None:
         # calcular latencia promedio ignorando ceros
         valid_latencies = [l for _, l in self.latencies if l > 0]
-        avg_latency = (
+        avg_valid_latency = (
             sum(valid_latencies) / len(valid_latencies)
             if valid_latencies else float("nan")
         )
 
         self.log.info(f"✔️ assign_success    = {self.assign_success}")
         self.log.info(f"ℹ️ redundant_delivers = {self.redundant_delivers}")
-        self.log.info(f"⏱️ avg_latency       = {avg_latency:.3f}s")
+        self.log.info(f"⏱️ avg_latency       = {avg_valid_latency:.3f}s")
         # ... resto del finish ...
 
         total_time = self.provider.current_time() - self.start_time
-        unique = len(config.METRICS["unique_ids"])
+        unique = self.unique_count
         redundant = config.METRICS["redundant"]
         success = self.assign_success
         assigns = self.assign_count
         avg_latency = sum(l for _, l in self.latencies) / len(self.latencies) if self.latencies else float('nan')
         discovery_rate = unique / total_time if total_time>0 else float('nan')
         success_rate   = success / assigns if assigns>0 else float('nan')
+        # Latencia ASSIGN→DELIVER por urgencia (mismo filtro > 0 que avg_latency)
+        reg = registry()
+        by_urgency = {u: [l for i, l in self.latencies if l > 0 and reg.urgency[i] == u] for u in (1, 2, 3)}
+        latency_u = {u: sum(ls) / len(ls) if ls else float('nan') for u, ls in by_urgency.items()}
+        solve_ms = self.assign_solve_ms
+        solve_avg = sum(solve_ms) / len(solve_ms) if solve_ms else float('nan')
+        solve_max = max(solve_ms) if solve_ms else float('nan')
+
+        # Resumen tipado del run: lo lee run_simulation.run() en vez de parsear el log
+        self.summary = {
+            "assign_success":     success,
+            "redundant_delivers": self.redundant_delivers,
+            "avg_latency":        avg_valid_latency,
+            "discovery_rate":     discovery_rate,
+            "global_score":       self.global_score,
+            "cam_matches":        self.cam_poi_matches,
+            "assigns_sent":       assigns,
+            "assign_rate":        success_rate,
+            "unique_ids":         unique,
+            "cam_raw_count":      self.cam_raw_count,
+            "never_covered":      len(self.never_covered),
+            "assign_solve_ms":    solve_avg,
+            "assign_solve_ms_max": solve_max,
+            "latency_u1":         latency_u[1],
+            "latency_u2":         latency_u[2],
+            "latency_u3":         latency_u[3],
+            "relayed_delivered":  self.relayed_delivered,
+        }
 
         self.log.info(f"✅ EQC finished. Unique={unique}, redundant={redundant}")
         self.log.info(f"   Assigns sent={assigns}, successful delivers={success} (rate={success_rate:.2f})")
         self.log.info(f"   Avg. latency={avg_latency:.2f}s, discovery rate={discovery_rate:.2f} PoIs/s")
+        self.log.info("⏱️ Latencia por urgencia: " + ", ".join(
+            f"u{u}={latency_u[u]:.2f}s ({len(by_urgency[u])})" for u in (1, 2, 3)))
+        if solve_ms:
+            self.log.info(f"🧮 optimal_batch: {len(solve_ms)} resoluciones, "
+                          f"media {solve_avg:.3f} ms, máx {solve_max:.3f} ms")
+        if self.relayed_delivered:
+            self.log.info(f"🤝 {self.relayed_delivered} PoIs entregados por relevo; por descubridor: "
+                          f"{dict(sorted(self.credited.items()))}")
         self.log.info(f"⭐ Global mission score = {self.global_score:.2f}")
         config.METRICS["global_score"] = self.global_score
         self.log.info(f"📷 Cámara hizo {self.cam_raw_count} detecciones totales, "
@@ -456,6 +592,44 @@ class EQCProtocol(IProtocol):
             self.log.warning(f"⚠️ Métodos nunca ejecutados: {never_called}")
 
 
+    def _best_pending(self, pos, k: int) -> List[int]:
+        """Los k pendientes de mayor urgency / distancia a `pos` (greedy y load-balancing)."""
+        best = self.pending.top_k(pos[0], pos[1], k)
+        if self.log.isEnabledFor(logging.DEBUG):
+            reg = registry()
+            for score, poi in best:
+                self.log.debug(f"    ⋅ {reg.labels[poi]} urg={reg.urgency[poi]} score={score:.2f}")
+        return [poi for _, poi in best]
+
+    def _match_detections(self, detected: List[dict]) -> List[int]:
+        """
+        Índices en config.POIS de los PoIs fotografiados, en orden de config.POIS.
+        Usa el node id (config.POI_NODES) cuando la detección lo trae; si no
+        (CameraHardware de gradysim sólo devuelve position/type), el hash de
+        coordenadas: PoI más cercano a <= COORD_MATCH_EPS y a ras de suelo.
+        """
+        eps = config.COORD_MATCH_EPS
+        coord_hash = registry().coord_hash
+        hits = set()
+        for node in detected:
+            idx = config.POI_NODES.get(node["id"]) if "id" in node else None
+            if idx is None:
+                x, y, z = node["position"]
+                if abs(z) >= eps:
+                    continue   # VQCs / EQC, no PoIs
+                idx = coord_hash.nearest(x, y, eps)
+            if idx is not None:
+                hits.add(idx)
+        return sorted(hits)
+
+    def _pictured_pois(self) -> List[int]:
+        """
+        Capa pasiva: índices de los PoIs dentro del cono de la cámara, con el
+        sensor vectorizado sobre las coordenadas del registro (mismo test de
+        alcance y ángulo que CameraHardware.take_picture).
+        """
+        return self.sensor.visible(self.provider.node.position).tolist()
+
     def _log_raw_detections(self, detected: List[dict]):
         """
         Agrupa y logea posiciones únicas de las detecciones en un solo mensaje.
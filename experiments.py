@@ -1,86 +1,232 @@
-
-import subprocess
-import re
+"""
+experiments.py
+Parameter sweep driver:
+- Expands the grid seeds × num_pois × num_vqcs × buffer_size × speed × camera_reach.
+- Runs every grid point through run_simulation.run() in its own child process, `--workers` at a time.
+- A crashed or hung run (killed after `--timeout` s) only loses its own row.
+- experiment_results.csv is always written in grid order, whatever order runs finish in.
+- Runs are headless by default (virtual time, no visualization); --no-headless restores real time.
+- PoIs are a passive layer by default; --poi_nodes sweeps with one POIProtocol node per PoI.
+- --camera_schedule sweeps with the precomputed E-QC visibility schedule instead of pictures.
+- Messages are passed as in-process objects by default (wire.py "object" mode);
+  --wire_format binary/json serializes them, --wire_strict validates the objects.
+- --policy picks the E-QC assignment policy (load_balancing by default);
+  --route_planner arrival flies assigned PoIs in arrival order instead of the 2-opt route;
+  --rendezvous makes V-QCs return to the E-QC to deliver (buffer full or urgent PoI held);
+  --relay lets V-QCs hand discovered PoIs to neighbours that will reach the E-QC sooner.
+- Finished points are kept in a result cache (result_cache.py); re-running only simulates new points.
+"""
+import argparse
 import csv
 import itertools
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, fields
+from typing import Dict, List, Optional
+
+from result_cache import ResultCache
+from run_simulation import RunParams, RunMetrics, run
 
-seeds = list(range(100, 101))  
+seeds = list(range(100, 101))
 num_pois_list     = [50, 100, 200]      # densidades de PoIs
 num_vqcs_list     = [5, 10, 20]         # número de V-QCs
 buffer_sizes_list = [3, 5, 10]          # tamaño de buffer M
 speeds_list       = [5.0]               # velocidad de vuelo (m/s)
 camera_reaches    = [10.0, 15.0, 20.0]  # alcance oblicuo de la cámara
 
+GRID_COLUMNS = ['seed', 'num_pois', 'num_vqcs', 'buffer_size', 'speed', 'camera_reach']   # ejes del grid (nombre del log)
+PARAM_COLUMNS = [f.name for f in fields(RunParams)]
+METRIC_COLUMNS = [f.name for f in fields(RunMetrics)]
+# status: ok | crashed | timeout (las filas fallidas quedan con métricas vacías)
+CSV_COLUMNS = PARAM_COLUMNS + METRIC_COLUMNS + ['status']
 
-with open('experiment_results.csv', 'w', newline='', encoding='utf-8') as csvfile:
-    writer = csv.writer(csvfile)
-    writer.writerow([
-        'seed','num_pois','num_vqcs','buffer_size',
-        'speed','camera_reach',
-        'assign_success','redundant_delivers',
-        'avg_latency','discovery_rate',
-        'global_score','cam_matches','assigns_sent','assign_rate'  # <<< CAMBIO
-    ])
 
-    for seed in seeds:              
+def grid_points(headless: bool = True, poi_nodes: bool = False,
+                camera_schedule: bool = False, wire_format: str = "object",
+                wire_strict: bool = False, policy: str = "load_balancing",
+                route_planner: str = "2opt", rendezvous: bool = False,
+                relay: bool = False) -> List[Dict]:
+    """
+    Devuelve los puntos del barrido en el mismo orden en que se escriben al CSV
+    (semilla más externa, luego itertools.product de los demás ejes). Cada
+    punto lleva todos los campos de RunParams (los no barridos, por defecto).
+    """
+    points = []
+    for seed in seeds:
         for pois, vqcs, buf, spd, reach in itertools.product(
             num_pois_list, num_vqcs_list, buffer_sizes_list, speeds_list, camera_reaches
         ):
-            cmd = (
-                f"python run_simulation.py"
-                f" --seed {seed}"                   
-                f" --num_pois {pois}"
-                f" --num_vqcs {vqcs}"
-                f" --buffer_size {buf}"
-                f" --speed {spd}"
-                f" --camera_reach {reach}"
-            )
-            # … resto idéntico …
-            print(f"\n🏃 Ejecutando: {cmd}")
-            proc = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            log = proc.stdout + proc.stderr
-
-            # Extraer métricas con regex
-            a_s = re.search(r'assign_success\s*=\s*(\d+)', log)
-            r_d = re.search(r'redundant_delivers\s*=\s*(\d+)', log)
-            a_l = re.search(r'avg_latency\s*=\s*([\d\.]+)s', log)
-            d_r = re.search(r'discovery rate=\s*([\d\.]+)\s*PoIs/s', log)
-
-            gms = re.search(r'Global mission score\s*=\s*([\d\.]+)', log)
-            global_score = float(gms.group(1)) if gms else ''
-
-            # Camera matches
-            cam = re.search(
-                r'Cámara hizo\s*\d+\s*detecciones.*?,\s*(\d+)\s*coincidencias',
-                log
-            )
-            cam_matches = int(cam.group(1)) if cam else ''
+            points.append(asdict(RunParams(**{
+                'seed': seed, 'num_pois': pois, 'num_vqcs': vqcs,
+                'buffer_size': buf, 'speed': spd, 'camera_reach': reach,
+                'headless': headless, 'poi_nodes': poi_nodes,
+                'camera_schedule': camera_schedule,
+                'wire_format': wire_format, 'wire_strict': wire_strict,
+                'assignment_policy': policy, 'route_planner': route_planner,
+                'rendezvous': rendezvous, 'relay': relay,
+            })))
+    return points
 
-            # Assigns sent & assign rate (successful delivers ya ≡ assign_success)
-            ar = re.search(
-                r'Assigns sent=(\d+), successful delivers=(\d+) \(rate=([\d\.]+)\)',
-                log
-            )
-            assigns_sent = int(ar.group(1)) if ar else ''
-            assign_rate  = float(ar.group(3)) if ar else ''
-            
-            writer.writerow([
-                seed, pois, vqcs, buf, spd, reach,
-                int(a_s.group(1)) if a_s else '',
-                int(r_d.group(1)) if r_d else '',
-                float(a_l.group(1)) if a_l else '',
-                float(d_r.group(1)) if d_r else '',
-                global_score,    # <<< CAMBIO
-                cam_matches,     # <<< CAMBIO
-                assigns_sent,    # <<< CAMBIO
-                assign_rate      # <<< CAMBIO
-            ])
 
+def _run_child(conn, params: Dict, log_path: str) -> None:
+    """Cuerpo del proceso hijo: corre la simulación y devuelve las métricas por el pipe."""
+    # gradysim añade un StreamHandler por run; el log completo ya va a log_path
+    sys.stderr = open(os.devnull, "w")
+    root = logging.getLogger()
+    fh = logging.FileHandler(log_path, "w", "utf-8")
+    fh.setFormatter(logging.Formatter("%(asctime)s %(name)-12s %(levelname)-8s %(message)s"))
+    root.addHandler(fh)
+    try:
+        conn.send(("ok", asdict(run(RunParams(**params)))))
+    except Exception as e:
+        root.exception("Run failed")
+        conn.send(("crashed", repr(e)))
+    finally:
+        conn.close()
+
+
+def _empty_row(params: Dict, status: str) -> Dict:
+    """Fila de un punto sin métricas (crash o timeout)."""
+    row = {k: params.get(k, '') for k in PARAM_COLUMNS}
+    row.update({k: '' for k in METRIC_COLUMNS})
+    row['status'] = status
+    return row
+
+
+def run_point(params: Dict, timeout: float, log_dir: str) -> Dict:
+    """
+    Ejecuta un punto del barrido llamando a run_simulation.run() en un proceso
+    hijo (fork: sin arrancar otro intérprete ni re-importar módulos), para poder
+    matarlo si se cuelga. Nunca lanza excepción: un crash o un timeout sólo
+    marcan el status de la fila.
+    """
+    row = _empty_row(params, 'crashed')
+    recv = proc = None
+    try:
+        tag = "_".join(f"{k}{params[k]}" for k in GRID_COLUMNS)
+        ctx = multiprocessing.get_context()
+        recv, send = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_run_child, args=(send, params, os.path.join(log_dir, f"{tag}.log")))
+        proc.start()
+        send.close()
+        if recv.poll(timeout):
+            status, payload = recv.recv()
+            row['status'] = status
+            if status == 'ok':
+                row.update(payload)
+        else:
+            row['status'] = 'timeout'
+    except EOFError:
+        # el hijo murió sin contestar (segfault, OOM killer, ...)
+        row['status'] = 'crashed'
+    except Exception as e:
+        # fallo al preparar o lanzar el hijo: sólo se pierde esta fila
+        print(f"⚠️ Punto {params} no lanzado: {e!r}")
+        row['status'] = 'crashed'
+    finally:
+        if recv is not None:
+            recv.close()
+        if proc is not None and proc.pid is not None:
+            if proc.is_alive():
+                proc.kill()
+            proc.join()
+    return row
+
+
+def run_sweep(points: List[Dict], workers: int, timeout: float,
+              out_path: str, log_dir: str, cache: Optional[ResultCache] = None) -> None:
+    """
+    Lanza hasta `workers` simulaciones a la vez. Los resultados que llegan
+    fuera de orden se retienen hasta que todas las filas anteriores estén
+    escritas, así el CSV es siempre un prefijo del orden del grid.
+    Con `cache`, los puntos ya calculados no se vuelven a simular y cada run
+    terminado se guarda en cuanto acaba (un barrido interrumpido se reanuda).
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    done: Dict[int, Dict] = {}
+    next_row = finished = 0
+
+    todo = []
+    for i, p in enumerate(points):
+        hit = cache.get(p) if cache is not None else None
+        if hit is None:
+            todo.append(i)
+        else:
+            done[i] = {**p, **hit, 'status': 'ok'}
+
+    with open(out_path, 'w', newline='', encoding='utf-8') as csvfile, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        writer = csv.DictWriter(csvfile, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+
+        while next_row in done:
+            writer.writerow(done.pop(next_row))
+            next_row += 1
+
+        futures = {pool.submit(run_point, points[i], timeout, log_dir): i for i in todo}
+        print(f"🏃 {len(todo)} simulaciones ({len(points) - len(todo)} en caché), {workers} workers")
+        for fut in as_completed(futures):
+            i = futures[fut]
+            try:
+                row = fut.result()
+            except Exception as e:
+                print(f"⚠️ Punto {points[i]} falló fuera del hijo: {e!r}")
+                row = _empty_row(points[i], 'crashed')
+            done[i] = row
+            if cache is not None and row['status'] == 'ok':
+                cache.put(points[i], {k: row[k] for k in METRIC_COLUMNS})
+            finished += 1
             print(
-                f"→ seed={seed}, Pois={pois}, VQCs={vqcs}, M={buf}, "
-                f"speed={spd}, reach={reach} → "
-                f"assign_success={a_s.group(1) if a_s else '?'}  "
-                f"redundant_delivers={r_d.group(1) if r_d else '?'}  "
-                f"global_score={global_score}  "  
-                f"assign_rate={assign_rate}"      
-            )
\ No newline at end of file
+                f"[{finished}/{len(todo)}] {row['status']}: "
+                f"seed={row['seed']}, Pois={row['num_pois']}, VQCs={row['num_vqcs']}, "
+                f"M={row['buffer_size']}, speed={row['speed']}, reach={row['camera_reach']} → "
+                f"assign_success={row['assign_success']}  "
+                f"redundant_delivers={row['redundant_delivers']}  "
+                f"global_score={row['global_score']}  "
+                f"assign_rate={row['assign_rate']}  "
+                f"sim_speed={row['sim_speed']}"
+            )
+            while next_row in done:
+                writer.writerow(done.pop(next_row))
+                next_row += 1
+            csvfile.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Barrido de parámetros en paralelo")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Simulaciones simultáneas (por defecto: nº de CPUs)')
+    parser.add_argument('--timeout', type=float, default=600.0,
+                        help='Segundos antes de matar una simulación colgada')
+    parser.add_argument('--out', default='experiment_results.csv', help='CSV de salida')
+    parser.add_argument('--log_dir', default='sweep_logs', help='Carpeta para el sim.log de cada punto')
+    parser.add_argument('--cache_dir', default='.sweep_cache', help='Caché de resultados por punto')
+    parser.add_argument('--no_cache', action='store_true', help='Recalcula todos los puntos')
+    parser.add_argument('--headless', action=argparse.BooleanOptionalAction, default=True,
+                        help='Tiempo virtual sin visualización (--no-headless: tiempo real con visualización)')
+    parser.add_argument('--poi_nodes', action='store_true',
+                        help='Un nodo POIProtocol por PoI en vez de la capa pasiva (validación)')
+    parser.add_argument('--camera_schedule', action='store_true',
+                        help='Detección del EQC por calendario de visibilidad en vez de fotos')
+    parser.add_argument('--wire_format', default="object", choices=["object", "binary", "json"],
+                        help='Formato de los mensajes (object: sin serializar, mismos resultados)')
+    parser.add_argument('--wire_strict', action='store_true',
+                        help='Con object: valida la ida y vuelta de cada mensaje por el formato binario')
+    parser.add_argument('--policy', default="load_balancing",
+                        choices=["greedy", "round_robin", "load_balancing", "optimal_batch", "auction"],
+                        help='Política de asignación del EQC')
+    parser.add_argument('--route_planner', default="2opt", choices=["2opt", "arrival"],
+                        help='Orden de visita de los PoIs asignados (arrival: orden de llegada)')
+    parser.add_argument('--rendezvous', action='store_true',
+                        help='Los VQCs vuelven al EQC a entregar con el buffer lleno o un PoI urgente')
+    parser.add_argument('--relay', action='store_true',
+                        help='Relevo de PoIs descubiertos a vecinos que llegarán antes al EQC')
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ResultCache(args.cache_dir)
+    run_sweep(grid_points(args.headless, args.poi_nodes, args.camera_schedule,
+                          args.wire_format, args.wire_strict, args.policy,
+                          args.route_planner, args.rendezvous, args.relay), max(1, args.workers), args.timeout, args.out, args.log_dir, cache)
@@ -0,0 +1,138 @@
+"""
+Pending-PoI store of the E-QC (PoIs detected and not yet assigned):
+- Keyed by registry index: O(1) insertion, membership and removal, and
+  iteration in insertion (detection) order.
+- The pending PoIs are also bucketed in a uniform grid, so top_k(x, y, k)
+  answers "the k best PoIs by urgency / distance from (x, y)" by visiting grid
+  rings outwards and stopping as soon as no PoI further out can beat the k-th
+  best: O(k log k) plus the rings visited instead of scoring and sorting every
+  pending PoI.
+- Ties in score keep insertion order, i.e. the same choice as a stable sort of
+  the pending list.
+"""
+import heapq
+import math
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+BRUTE_FORCE_MAX = 32        # con pocos pendientes, puntuarlos todos es más barato que recorrer anillos
+POIS_PER_CELL = 4           # densidad objetivo de la rejilla cuando no se fija `cell`
+
+
+class PendingStore:
+
+    def __init__(self, xy: Sequence[Tuple[float, float]], urgency: Sequence[int],
+                 cell: Optional[float] = None):
+        """cell: lado (m) de las celdas; None = según la densidad de PoIs (~POIS_PER_CELL por celda)."""
+        self._xy = xy
+        self._urg = [int(u) for u in urgency]
+        self.cell = float(cell) if cell else _auto_cell(xy)
+        self._cell_of = [(math.floor(x / self.cell), math.floor(y / self.cell)) for x, y in xy]
+        cxs = [c[0] for c in self._cell_of] or [0]
+        cys = [c[1] for c in self._cell_of] or [0]
+        self._bbox = (min(cxs), min(cys), max(cxs), max(cys))     # celdas que pueden tener PoIs
+        self._order: Dict[int, int] = {}                  # índice → nº de inserción (orden de iteración)
+        self._cells: Dict[Tuple[int, int], Dict[int, None]] = {}
+        self._next_seq = 0
+        self._max_urg = max(self._urg, default=0)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, idx: int) -> bool:
+        return idx in self._order
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._order)
+
+    def __repr__(self) -> str:
+        return f"PendingStore({list(self._order)})"
+
+    def add(self, idx: int) -> None:
+        if idx in self._order:
+            return
+        self._order[idx] = self._next_seq
+        self._next_seq += 1
+        self._cells.setdefault(self._cell_of[idx], {})[idx] = None
+
+    def discard(self, idx: int) -> None:
+        if self._order.pop(idx, None) is None:
+            return
+        key = self._cell_of[idx]
+        bucket = self._cells[key]
+        del bucket[idx]
+        if not bucket:
+            del self._cells[key]
+
+    def first(self) -> int:
+        """El pendiente más antiguo."""
+        return next(iter(self._order))
+
+    def score(self, idx: int, x: float, y: float) -> float:
+        px, py = self._xy[idx]
+        return self._urg[idx] / max(1e-6, math.hypot(x - px, y - py))
+
+    def top_k(self, x: float, y: float, k: int) -> List[Tuple[float, int]]:
+        """
+        Los k pendientes de mayor urgency / distancia a (x, y), como
+        (score, índice) de mayor a menor score (empates: orden de inserción).
+        """
+        if k <= 0 or not self._order:
+            return []
+        heap: List[Tuple[float, int, int]] = []           # (score, -seq, idx): el peor arriba
+
+        def push(idx: int) -> None:
+            item = (self.score(idx, x, y), -self._order[idx], idx)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+        if len(self._order) <= BRUTE_FORCE_MAX:
+            for idx in self._order:
+                push(idx)
+        else:
+            self._ring_search(x, y, k, heap, push)
+        return [(s, idx) for s, _, idx in sorted(heap, reverse=True)]
+
+    def _ring_search(self, x: float, y: float, k: int, heap, push) -> None:
+        # Anillo r: celdas a distancia de Chebyshev r de la celda de (x, y). Todo
+        # lo que queda fuera de los anillos 0..r está a más de r·cell, así que su
+        # score es como mucho max_urg / (r·cell).
+        qx, qy = math.floor(x / self.cell), math.floor(y / self.cell)
+        x0, y0, x1, y1 = self._bbox
+        reach = max(qx - x0, x1 - qx, qy - y0, y1 - qy)
+        seen = 0
+        for r in range(reach + 1):
+            for key in _ring(qx, qy, r):
+                bucket = self._cells.get(key)
+                if bucket:
+                    for idx in bucket:
+                        push(idx)
+                    seen += len(bucket)
+            if seen == len(self._order):
+                return
+            if len(heap) == k:
+                bound = self._max_urg / (r * self.cell) if r > 0 else math.inf
+                if bound * (1 + 1e-12) < heap[0][0]:
+                    return
+
+
+def _auto_cell(xy: Sequence[Tuple[float, float]]) -> float:
+    if len(xy) < 2:
+        return 1.0
+    xs = [p[0] for p in xy]
+    ys = [p[1] for p in xy]
+    area = max(max(xs) - min(xs), 1e-3) * max(max(ys) - min(ys), 1e-3)
+    return math.sqrt(area * POIS_PER_CELL / len(xy))
+
+
+def _ring(qx: int, qy: int, r: int) -> Iterator[Tuple[int, int]]:
+    if r == 0:
+        yield qx, qy
+        return
+    for cx in range(qx - r, qx + r + 1):
+        yield cx, qy - r
+        yield cx, qy + r
+    for cy in range(qy - r + 1, qy + r):
+        yield qx - r, cy
+        yield qx + r, cy
@@ -0,0 +1,98 @@
+"""
+PoI buffers of the V-QC, over registry indices (poi_registry.py):
+- PoIBuffer: bounded buffer (capacity M) that keeps insertion order, with O(1)
+  membership, insertion and removal (a dict used as an ordered set). Used for
+  discovered and next2visit.
+- PoISet: bitset over the registry with an element count, for visited.
+- Both track their current size and peak size, reported by the V-QC in finish().
+"""
+from typing import Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+from poi_registry import registry
+
+
+class PoIBuffer:
+    """Buffer acotado de índices de PoI en orden de inserción."""
+
+    __slots__ = ("capacity", "peak", "_items")
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity        # None = sin límite
+        self.peak = 0
+        self._items: Dict[int, None] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, idx: int) -> bool:
+        return idx in self._items
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._items)
+
+    def __repr__(self) -> str:
+        return f"PoIBuffer({list(self._items)}, capacity={self.capacity})"
+
+    @property
+    def full(self) -> bool:
+        return self.capacity is not None and len(self._items) >= self.capacity
+
+    def add(self, idx: int) -> bool:
+        """Añade al final; False si ya estaba o el buffer está lleno."""
+        if idx in self._items or self.full:
+            return False
+        self._items[idx] = None
+        if len(self._items) > self.peak:
+            self.peak = len(self._items)
+        return True
+
+    def discard(self, idx: int) -> None:
+        self._items.pop(idx, None)
+
+    def discard_all(self, indices: Iterable[int]) -> None:
+        for idx in indices:
+            self._items.pop(idx, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def reorder(self, order: Iterable[int]) -> None:
+        """Mismo contenido en el orden dado (p. ej. la ruta planificada)."""
+        items = dict.fromkeys(order)
+        if items.keys() != self._items.keys():
+            raise ValueError(f"reorder cambia el contenido: {list(order)} vs {list(self._items)}")
+        self._items = items
+
+
+class PoISet:
+    """Conjunto de PoIs como bitset sobre el registro (sólo crece: peak = tamaño)."""
+
+    __slots__ = ("_bits", "_count")
+
+    def __init__(self):
+        self._bits = registry().flags()
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, idx: int) -> bool:
+        return bool(self._bits[idx])
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(np.flatnonzero(self._bits).tolist())
+
+    @property
+    def peak(self) -> int:
+        return self._count
+
+    def add(self, idx: int) -> None:
+        if not self._bits[idx]:
+            self._bits[idx] = True
+            self._count += 1
+
+    def update(self, indices: Iterable[int]) -> None:
+        for idx in indices:
+            self.add(idx)
@@ -0,0 +1,56 @@
+"""
+PoI registry, built once per run from config.POIS (the config.get_pois output):
+- Struct-of-arrays storage: ids, labels, coords (NumPy float64, P×2) and
+  urgency (NumPy int8), all indexed by the PoI's position in config.POIS.
+- That index is the PoI's identity everywhere else: protocol state, messages
+  and metrics use it, and ids/labels are only looked up for logs and reports.
+  flags() and times() allocate the per-PoI bitsets / timestamp arrays.
+- The spatial grids over the PoIs (R_DETECT queries, camera coordinate hash).
+- registry() returns the registry shared by every protocol of the current run;
+  protocols query it instead of scanning config.POIS.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from spatial_index import PoIGrid
+
+
+class PoIRegistry:
+
+    def __init__(self, pois: List[Dict]):
+        self.pois = tuple(pois)     # dicts originales, para payloads y logs
+        self.ids: List[str] = [p["id"] for p in pois]
+        self.labels: List[str] = [p["label"] for p in pois]
+        self.coords = np.array([p["coord"] for p in pois], dtype=np.float64).reshape(-1, 2)
+        self.urgency = np.array([p["urgency"] for p in pois], dtype=np.int8)
+        self.xy: List[Tuple[float, float]] = [(float(x), float(y)) for x, y in (p["coord"] for p in pois)]
+
+        self.grid = PoIGrid(self.xy, cell=config.R_DETECT)
+        self.coord_hash = PoIGrid(self.xy, cell=config.COORD_MATCH_EPS)
+
+    def __len__(self) -> int:
+        return len(self.pois)
+
+    def flags(self) -> np.ndarray:
+        """Bitset por PoI (False = no marcado)."""
+        return np.zeros(len(self.pois), dtype=bool)
+
+    def times(self) -> np.ndarray:
+        """Instante por PoI (NaN = todavía no ocurrió)."""
+        return np.full(len(self.pois), np.nan)
+
+
+_shared: Optional[Tuple[List[Dict], PoIRegistry]] = None
+
+
+def registry() -> PoIRegistry:
+    """
+    Registro compartido de config.POIS. Se reconstruye sólo cuando
+    run_simulation asigna una lista de PoIs nueva (un run nuevo).
+    """
+    global _shared
+    if _shared is None or _shared[0] is not config.POIS:
+        _shared = (config.POIS, PoIRegistry(config.POIS))
+    return _shared[1]
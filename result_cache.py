@@ -0,0 +1,86 @@
+"""
+Content-addressed cache of sweep results:
+- Key = sha256 of the run parameters, the scenario they produce
+  (config.get_pois output, EQC_WAYPOINTS) and the simulation source files.
+- One JSON file per key under the cache directory, written atomically, so a
+  sweep killed halfway keeps every point that already finished.
+- Editing a protocol changes the source digest and invalidates every entry.
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Optional
+
+import config
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Ficheros cuyo contenido determina el resultado de un run
+SOURCE_FILES = [
+    "config.py",
+    "spatial_index.py",
+    "poi_registry.py",
+    "poi_buffers.py",
+    "pending_store.py",
+    "batch_assignment.py",
+    "auction.py",
+    "route_planner.py",
+    "trajectory.py",
+    "camera_sensor.py",
+    "visibility_schedule.py",
+    "telemetry_mobility.py",
+    "wire.py",
+    "poi_protocol.py",
+    "eqc_protocol.py",
+    "vqc_protocol.py",
+    "run_simulation.py",
+]
+
+
+@lru_cache(maxsize=None)
+def source_digest() -> str:
+    h = hashlib.sha256()
+    for name in SOURCE_FILES:
+        h.update(name.encode())
+        with open(os.path.join(HERE, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def cache_key(params: Dict) -> str:
+    """Hash de parámetros + escenario + código fuente."""
+    scenario = {
+        "pois":      config.get_pois(seed=params["seed"], n=params["num_pois"]),
+        "waypoints": config.EQC_WAYPOINTS,
+    }
+    blob = json.dumps(
+        {"params": params, "scenario": scenario, "source": source_digest()},
+        sort_keys=True, default=list,
+    )
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class ResultCache:
+    """Directorio de resultados indexado por cache_key()."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, params: Dict) -> Optional[Dict]:
+        try:
+            with open(self._path(cache_key(params)), encoding="utf-8") as f:
+                return json.load(f)["metrics"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, params: Dict, metrics: Dict) -> None:
+        path = self._path(cache_key(params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"params": params, "metrics": metrics}, f)
+        os.replace(tmp, path)
@@ -0,0 +1,81 @@
+"""
+Route planner for the V-QC next2visit targets:
+- Open route from the V-QC position through every target (no return leg),
+  on the XY plane: targets are all at the V-QC flight altitude.
+- plan(): nearest-neighbour construction followed by 2-opt.
+- extend(): incremental re-optimization when new targets arrive. The current
+  (already optimized) order is kept, each new target goes in by cheapest
+  insertion, and 2-opt then only has to repair the route locally.
+- path_length() measures any order, so the V-QC can log the distance saved
+  against flying the targets in arrival order.
+"""
+import math
+from typing import Dict, List, Sequence, Tuple
+
+Point = Tuple[float, float]
+
+
+def path_length(start: Point, pts: Sequence[Point]) -> float:
+    """Longitud de start → pts[0] → … → pts[-1]."""
+    total, prev = 0.0, start
+    for p in pts:
+        total += math.dist(prev, p)
+        prev = p
+    return total
+
+
+def plan(start: Point, targets: Dict[int, Point]) -> List[int]:
+    """Orden de visita de `targets` (índice → punto): vecino más cercano + 2-opt."""
+    left = dict(targets)
+    order, here = [], start
+    while left:
+        idx = min(left, key=lambda i: math.dist(here, left[i]))
+        here = left.pop(idx)
+        order.append(idx)
+    return two_opt(start, targets, order)
+
+
+def extend(start: Point, targets: Dict[int, Point], order: List[int], new: Sequence[int]) -> List[int]:
+    """Inserta `new` en `order` (ruta ya optimizada) por inserción más barata y repasa con 2-opt."""
+    order = list(order)
+    for idx in new:
+        p = targets[idx]
+        best_k, best_cost = len(order), math.inf
+        prev = start
+        for k, nxt in enumerate(order + [None]):
+            q = targets[nxt] if nxt is not None else None
+            cost = math.dist(prev, p) + (math.dist(p, q) - math.dist(prev, q) if q else 0.0)
+            if cost < best_cost:
+                best_k, best_cost = k, cost
+            if q is not None:
+                prev = q
+        order.insert(best_k, idx)
+    return two_opt(start, targets, order)
+
+
+def two_opt(start: Point, targets: Dict[int, Point], order: List[int]) -> List[int]:
+    """
+    Mejora 2-opt de una ruta abierta con origen fijo: invierte el tramo
+    order[i..j] mientras acorte la ruta (con M <= 10 objetivos es inmediato).
+    """
+    order = list(order)
+    n = len(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 1):
+            a = targets[order[i - 1]] if i else start
+            b = targets[order[i]]
+            for j in range(i + 1, n):
+                c = targets[order[j]]
+                delta = math.dist(a, c) - math.dist(a, b)
+                if j + 1 < n:
+                    d = targets[order[j + 1]]
+                    delta += math.dist(b, d) - math.dist(c, d)
+                if delta < -1e-9:
+                    order[i:j + 1] = order[i:j + 1][::-1]
+                    improved = True
+                    break
+            if improved:
+                break
+    return order
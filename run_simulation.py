@@ -2,80 +2,319 @@
 run_simulation.py
 Main script to set up and run the simulation:
 - Configures communication, timer, mobility, and visualization handlers.
-- Initializes E-QC, V-QCs, and PoI nodes.
+  Telemetry is delivered at a configurable period per node type
+  (telemetry_mobility.py) and never to static PoI nodes.
+- Initializes E-QC and V-QCs. PoIs are a passive layer (poi_registry.py)
+  queried by the camera and the V-QCs; --poi_nodes adds the old POIProtocol
+  node per PoI for validation runs.
 - Starts the simulation.
+- `run(params)` runs one simulation in-process and returns its RunMetrics
+  (used by experiments.py instead of scraping the log).
+- Headless mode (--headless): virtual time as fast as the CPU allows, no
+  visualization, only warnings logged during the run.
 """
 import logging
 import random
-import argparse                                       
-import config     
+import argparse
+import time
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import config
 
 from gradysim.simulator.handler.communication import CommunicationHandler, CommunicationMedium
 from gradysim.simulator.handler.timer import TimerHandler
-from gradysim.simulator.handler.mobility import MobilityHandler, MobilityConfiguration
+from gradysim.simulator.handler.mobility import MobilityConfiguration
 from gradysim.simulator.handler.visualization import VisualizationHandler
-from gradysim.simulator.simulation import SimulationBuilder, SimulationConfiguration
+from gradysim.simulator.simulation import SimulationBuilder, SimulationConfiguration, Simulator
 
 from poi_protocol import POIProtocol
 from eqc_protocol import EQCProtocol
 from vqc_protocol import VQCProtocol
+from telemetry_mobility import TelemetryRateMobilityHandler
+from wire import merge_stats
 from config import EQC_INIT_POS
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Ejecuta simulaciones con parámetros variables")
-    parser.add_argument('--num_pois',      type=int,required=True,   choices=[50,100,200], help='Cantidad de PoIs a usar')
-    parser.add_argument('--num_vqcs',      type=int,required=True,   choices=[5,10,20],     help='Número de V-QCs')
-    parser.add_argument('--buffer_size',   type=int,required=True,   choices=[3,5,10],    help='Tamaño máximo de buffer M')
-    parser.add_argument('--speed',         type=float,required=True, choices=[5.0,10.0],  help='Velocidad de vuelo (m/s)')
-    parser.add_argument('--camera_reach',  type=float,required=True, choices=[10.0,15.0,20.0], help='Alcance oblicuo de la cámara')
-    parser.add_argument('--seed',          type=int,required=True,help='Semilla para generar PoIs y posiciones iniciales')
- 
+RELAY_TYPES = ("RELAY_OFFER", "RELAY_ACCEPT", "RELAY", "RELAY_ACK", "RELAY_DELIVER")   # tráfico de relevo (relay_msgs/bytes)
 
-    args = parser.parse_args()
-    random.seed(args.seed)  
-    config.POIS = config.get_pois(seed=args.seed, n=args.num_pois)
-    config.NUM_VQCS   = args.num_vqcs    
-    config.M          = args.buffer_size 
-    config.R_CAMERA   = args.camera_reach
-    mobility_speed    = args.speed      
 
+@dataclass
+class RunParams:
+    """Un punto del barrido: los mismos parámetros que la CLI."""
+    seed: int
+    num_pois: int
+    num_vqcs: int
+    buffer_size: int
+    speed: float
+    camera_reach: float
+    # Tiempo virtual, sin visualización ni logs INFO. Los resultados no son
+    # idénticos a un run con visualización: sus eventos cambian el desempate
+    # entre eventos simultáneos en el heap de gradysim.
+    headless: bool = False
+    # Un nodo POIProtocol por PoI (modo antiguo, para validar la capa pasiva)
+    poi_nodes: bool = False
+    # Detección del EQC por calendario de visibilidad precomputado en vez de fotos
+    camera_schedule: bool = False
+    # Periodo (s) de la telemetría de EQC y VQCs; 0 = cada actualización de movilidad
+    eqc_telemetry: float = 0.0
+    vqc_telemetry: float = 0.0
+    # Formato de los mensajes: "binary" (wire.py), "json" (depuración) u
+    # "object" (objetos inmutables sin serializar, para barridos en proceso)
+    wire_format: str = "binary"
+    # Con "object": valida que cada mensaje sobreviviría al formato binario
+    wire_strict: bool = False
+    # Política de asignación del EQC (config.ASSIGNMENT_POLICY)
+    assignment_policy: str = "load_balancing"
+    # Orden de visita de next2visit: "2opt" (route_planner.py) u "arrival"
+    route_planner: str = "2opt"
+    # Volver al EQC a entregar con discovered lleno o un PoI urgente (config.RENDEZVOUS)
+    rendezvous: bool = False
+    # Relevo store-carry-forward de PoIs entre VQCs (config.RELAY)
+    relay: bool = False
 
-    root = logging.getLogger()
-    root.setLevel(logging.DEBUG)
-    fmt = logging.Formatter("%(asctime)s %(name)-12s %(levelname)-8s %(message)s")
-    ch = logging.StreamHandler(); ch.setFormatter(fmt); root.addHandler(ch)
-    fh = logging.FileHandler("sim.log","w","utf-8"); fh.setFormatter(fmt); root.addHandler(fh)
 
-    root.info(
-        f"✅ Simulation start — seed={args.seed}, num_pois={len(config.POIS)}, "
+@dataclass
+class RunMetrics:
+    """Contadores del EQC y de los VQCs al terminar un run."""
+    assign_success: int
+    redundant_delivers: int
+    avg_latency: float          # media de latencias ASSIGN→DELIVER > 0 (s)
+    latency_u1: float           # la misma media por urgencia del PoI (1 baja … 3 alta)
+    latency_u2: float
+    latency_u3: float
+    discovery_rate: float       # PoIs únicos / tiempo simulado (PoIs/s)
+    global_score: float
+    cam_matches: int
+    assigns_sent: int
+    assign_rate: float
+    unique_ids: int
+    cam_raw_count: int
+    disc_casual: int            # suma sobre todos los VQCs
+    disc_assigned: int
+    never_covered: int          # PoIs que la patrulla del EQC nunca pone al alcance de la cámara
+    assign_solve_ms: float      # optimal_batch: ms medios y máximos por resolución (NaN con otras políticas)
+    assign_solve_ms_max: float
+    alloc_latency: float        # media por PoI de detección → primer ASSIGN (o compromiso en la subasta), s
+    alloc_duplicates: int       # subasta: compromisos con un PoI que ya tenía otro VQC (vecindarios sin contacto)
+    vqc_timer_rate: float       # eventos de timer de los VQCs por segundo simulado (suma)
+    vqc_mission_rate: float     # misiones lanzadas por los VQCs por segundo simulado (suma)
+    route_saved_m: float        # metros de ruta ahorrados por el planificador frente al orden de llegada (suma)
+    rendezvous_trips: int       # vueltas de los VQCs al EQC para entregar (RENDEZVOUS)
+    e2e_latency: float          # media por PoI de descubrimiento en un VQC → DELIVER_ACK, s
+    relay_handoffs: int         # PoIs tomados en custodia por otro VQC (RELAY)
+    relayed_delivered: int      # PoIs nuevos que llegaron al EQC por relevo
+    eqc_telemetry_rate: float   # eventos de telemetría por segundo simulado, por tipo de nodo
+    vqc_telemetry_rate: float
+    poi_telemetry_rate: float
+    hello_bytes: int            # bytes enviados por tipo de mensaje (EQC + VQCs)
+    hello_ack_bytes: int
+    assign_bytes: int
+    deliver_bytes: int
+    deliver_ack_bytes: int
+    announce_bytes: int         # modo auction
+    bid_bytes: int
+    relay_msgs: int             # mensajes y bytes de relevo (RELAY_OFFER/ACCEPT, RELAY/ACK, RELAY_DELIVER)
+    relay_bytes: int
+    messages_sent: int          # mensajes enviados de todos los tipos (EQC + VQCs)
+    sim_time: float             # segundos simulados
+    wall_time: float            # segundos reales de start_simulation()
+    sim_speed: float            # segundos simulados por segundo real
+
+
+def build_simulation(params: RunParams) -> Tuple[Simulator, int, List[int]]:
+    """
+    Aplica `params` a config, construye la simulación y devuelve
+    (simulador, id del EQC, ids de los VQCs).
+    """
+    log = logging.getLogger()
+    random.seed(params.seed)
+    config.POIS       = config.get_pois(seed=params.seed, n=params.num_pois)
+    config.NUM_VQCS   = params.num_vqcs
+    config.M          = params.buffer_size
+    config.R_CAMERA   = params.camera_reach
+    config.POI_AS_NODES = params.poi_nodes
+    config.CAMERA_SCHEDULE = params.camera_schedule
+    config.EQC_TELEMETRY_PERIOD = params.eqc_telemetry
+    config.VQC_TELEMETRY_PERIOD = params.vqc_telemetry
+    config.WIRE_FORMAT = params.wire_format
+    config.WIRE_STRICT = params.wire_strict
+    config.ASSIGNMENT_POLICY = params.assignment_policy
+    config.ROUTE_PLANNER = params.route_planner
+    config.RENDEZVOUS = params.rendezvous
+    config.RELAY      = params.relay
+    mobility_speed    = params.speed
+
+    log.info(
+        f"✅ Simulation start — seed={params.seed}, num_pois={len(config.POIS)}, "
         f"duration={config.DURATION}s, VQCs={config.NUM_VQCS}, area={config.L}×{config.L}, "
         f"speed={mobility_speed} m/s, camera_reach={config.R_CAMERA}"
     )
 
  #####################——— Construcción de la simulación ———
-    sim_cfg = SimulationConfiguration(duration=config.DURATION, debug=False, real_time=True)
+    sim_cfg = SimulationConfiguration(
+        duration=config.DURATION, debug=False,
+        real_time=not params.headless,
+        execution_logging=not params.headless,
+    )
     builder = SimulationBuilder(sim_cfg)
 
-    builder.add_node(EQCProtocol, EQC_INIT_POS)
-    root.info("➕ Added EQCProtocol at (0,0,7)")
+    eqc_id = builder.add_node(EQCProtocol, EQC_INIT_POS)
+    log.info("➕ Added EQCProtocol at (0,0,7)")
   # Añadimos VQCs con posiciones reproducibles
+    vqc_ids = []
     for i in range(config.NUM_VQCS):
         pos = (random.uniform(0,config.L), random.uniform(0,config.L), 4.0)
-        builder.add_node(VQCProtocol, pos)
-        root.info(f"➕ Added VQCProtocol #{i+1} at {pos}")
-# Añadimos PoIs
-    for poi in config.POIS:
-        builder.add_node(POIProtocol, (poi["coord"][0], poi["coord"][1], 0.0))
-    root.info(f"➕ Added {len(config.POIS)} POIProtocol nodes")
+        vqc_ids.append(builder.add_node(VQCProtocol, pos))
+        log.info(f"➕ Added VQCProtocol #{i+1} at {pos}")
+# Añadimos PoIs: sólo en modo compatibilidad; si no, son la capa pasiva del registro
+    config.POI_NODES = {}
+    if params.poi_nodes:
+        for idx, poi in enumerate(config.POIS):
+            node_id = builder.add_node(POIProtocol, (poi["coord"][0], poi["coord"][1], 0.0))
+            config.POI_NODES[node_id] = idx
+        log.info(f"➕ Added {len(config.POIS)} POIProtocol nodes")
+    else:
+        log.info(f"📍 {len(config.POIS)} PoIs como capa pasiva (sin nodos)")
  # ——— Handler
     medium = CommunicationMedium(transmission_range=config.R_COMM)
     builder.add_handler(CommunicationHandler(medium))
     builder.add_handler(TimerHandler())
-    builder.add_handler(MobilityHandler(MobilityConfiguration(default_speed=mobility_speed))) 
-    builder.add_handler(VisualizationHandler())
-    root.info("🔧 Handlers added")
- # ——— Ejecución ———
-    sim = builder.build()
-    root.info("▶️ Starting simulation")
-    sim.start_simulation()
-    root.info("🏁 Simulation complete")
+    builder.add_handler(TelemetryRateMobilityHandler(
+        MobilityConfiguration(default_speed=mobility_speed),
+        telemetry_periods={
+            EQCProtocol: config.EQC_TELEMETRY_PERIOD,
+            VQCProtocol: config.VQC_TELEMETRY_PERIOD,
+            POIProtocol: config.POI_TELEMETRY_PERIOD,
+        },
+    ))
+    if not params.headless:
+        builder.add_handler(VisualizationHandler())
+    log.info("🔧 Handlers added")
+    return builder.build(), eqc_id, vqc_ids
+
+
+def simulate(params: RunParams) -> Tuple[Simulator, int, List[int], float]:
+    """
+    Ejecuta una simulación completa en este proceso y devuelve
+    (simulador terminado, id del EQC, ids de los VQCs, segundos reales).
+    El logger raíz queda como estaba (gradysim le añade un handler por run).
+    """
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    try:
+        sim, eqc_id, vqc_ids = build_simulation(params)
+        root.info("▶️ Starting simulation")
+        t0 = time.perf_counter()
+        sim.start_simulation()
+        wall_time = time.perf_counter() - t0
+        root.info("🏁 Simulation complete")
+    finally:
+        for h in root.handlers[:]:
+            if h not in handlers:
+                root.removeHandler(h)
+        root.setLevel(level)
+    return sim, eqc_id, vqc_ids, wall_time
+
+
+def run(params: RunParams) -> RunMetrics:
+    """Ejecuta una simulación completa en este proceso y devuelve sus métricas."""
+    sim, eqc_id, vqc_ids, wall_time = simulate(params)
+    eqc = sim.get_node(eqc_id).protocol_encapsulator.protocol
+    vqcs = [sim.get_node(v).protocol_encapsulator.protocol for v in vqc_ids]
+    sim_time = eqc.provider.current_time()
+    telemetry = eqc.provider.handlers["mobility"].telemetry_rates(sim_time)
+    wire = merge_stats([eqc.wire] + [v.wire for v in vqcs])
+    first_alloc = {}
+    commits = eqc.alloc_latencies + [a for v in vqcs for a in v.alloc_latencies]
+    for idx, latency in commits:
+        first_alloc[idx] = min(latency, first_alloc.get(idx, latency))
+    alloc = list(first_alloc.values())
+    first_e2e = {}
+    for idx, latency in (a for v in vqcs for a in v.e2e_latencies):
+        first_e2e[idx] = min(latency, first_e2e.get(idx, latency))
+    relay = [wire[t] for t in RELAY_TYPES]
+    return RunMetrics(
+        **eqc.summary,
+        disc_casual=sum(v.disc_casual for v in vqcs),
+        disc_assigned=sum(v.disc_assigned for v in vqcs),
+        vqc_timer_rate=sum(v.timer_events for v in vqcs) / sim_time if sim_time else 0.0,
+        vqc_mission_rate=sum(v.mission_starts for v in vqcs) / sim_time if sim_time else 0.0,
+        route_saved_m=sum(v.route_saved for v in vqcs),
+        rendezvous_trips=sum(v.rendezvous_trips for v in vqcs),
+        e2e_latency=sum(first_e2e.values()) / len(first_e2e) if first_e2e else float("nan"),
+        relay_handoffs=sum(v.relayed_in for v in vqcs),
+        eqc_telemetry_rate=telemetry.get(EQCProtocol.__name__, 0.0),
+        vqc_telemetry_rate=telemetry.get(VQCProtocol.__name__, 0.0),
+        poi_telemetry_rate=telemetry.get(POIProtocol.__name__, 0.0),
+        hello_bytes=wire["HELLO"]["bytes"],
+        hello_ack_bytes=wire["HELLO_ACK"]["bytes"],
+        assign_bytes=wire["ASSIGN"]["bytes"],
+        deliver_bytes=wire["DELIVER"]["bytes"],
+        deliver_ack_bytes=wire["DELIVER_ACK"]["bytes"],
+        announce_bytes=wire["ANNOUNCE"]["bytes"],
+        bid_bytes=wire["BID"]["bytes"],
+        relay_msgs=sum(w["msgs"] for w in relay),
+        relay_bytes=sum(w["bytes"] for w in relay),
+        messages_sent=sum(w["msgs"] for w in wire.values()),
+        alloc_latency=sum(alloc) / len(alloc) if alloc else float("nan"),
+        alloc_duplicates=len(commits) - len(first_alloc),
+        sim_time=sim_time,
+        wall_time=wall_time,
+        sim_speed=sim_time / wall_time if wall_time > 0 else float("nan"),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ejecuta simulaciones con parámetros variables")
+    parser.add_argument('--num_pois',      type=int,required=True,   choices=[50,100,200], help='Cantidad de PoIs a usar')
+    parser.add_argument('--num_vqcs',      type=int,required=True,   choices=[5,10,20],     help='Número de V-QCs')
+    parser.add_argument('--buffer_size',   type=int,required=True,   choices=[3,5,10],    help='Tamaño máximo de buffer M')
+    parser.add_argument('--speed',         type=float,required=True, choices=[5.0,10.0],  help='Velocidad de vuelo (m/s)')
+    parser.add_argument('--camera_reach',  type=float,required=True, choices=[10.0,15.0,20.0], help='Alcance oblicuo de la cámara')
+    parser.add_argument('--seed',          type=int,required=True,help='Semilla para generar PoIs y posiciones iniciales')
+    parser.add_argument('--log_file',      default="sim.log",        help='Fichero de log (uno por run en barridos paralelos)')
+    parser.add_argument('--headless',      action='store_true',      help='Tiempo virtual a máxima velocidad, sin visualización')
+    parser.add_argument('--poi_nodes',     action='store_true',      help='Un nodo POIProtocol por PoI (validación de la capa pasiva)')
+    parser.add_argument('--camera_schedule', action='store_true',    help='Detección del EQC por calendario de visibilidad precomputado')
+    parser.add_argument('--eqc_telemetry', type=float, default=0.0,  help='Periodo (s) de telemetría del EQC (0 = cada actualización)')
+    parser.add_argument('--vqc_telemetry', type=float, default=0.0,  help='Periodo (s) de telemetría de los VQCs (0 = cada actualización)')
+    parser.add_argument('--wire_format',   default="binary", choices=["binary", "json", "object"],
+                        help='Formato de los mensajes (json para depurar, object sin serializar)')
+    parser.add_argument('--wire_strict',   action='store_true',      help='Con object: valida la ida y vuelta por el formato binario')
+    parser.add_argument('--policy',        default="load_balancing",
+                        choices=["greedy", "round_robin", "load_balancing", "optimal_batch", "auction"],
+                        help='Política de asignación del EQC')
+    parser.add_argument('--route_planner', default="2opt", choices=["2opt", "arrival"],
+                        help='Orden de visita de los PoIs asignados (arrival: orden de llegada)')
+    parser.add_argument('--rendezvous',    action='store_true',
+                        help='Volver al EQC a entregar con el buffer lleno o un PoI urgente')
+    parser.add_argument('--relay',         action='store_true',
+                        help='Relevo de PoIs descubiertos a vecinos que llegarán antes al EQC')
+
+
+    args = parser.parse_args()
+    params = RunParams(
+        seed=args.seed, num_pois=args.num_pois, num_vqcs=args.num_vqcs,
+        buffer_size=args.buffer_size, speed=args.speed, camera_reach=args.camera_reach,
+        headless=args.headless, poi_nodes=args.poi_nodes, camera_schedule=args.camera_schedule,
+        eqc_telemetry=args.eqc_telemetry, vqc_telemetry=args.vqc_telemetry,
+        wire_format=args.wire_format, wire_strict=args.wire_strict,
+        assignment_policy=args.policy, route_planner=args.route_planner, rendezvous=args.rendezvous,
+        relay=args.relay,
+    )
+
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG)
+    fmt = logging.Formatter("%(asctime)s %(name)-12s %(levelname)-8s %(message)s")
+    ch = logging.StreamHandler(); ch.setFormatter(fmt); root.addHandler(ch)
+    fh = logging.FileHandler(args.log_file,"w","utf-8"); fh.setFormatter(fmt); root.addHandler(fh)
+
+    metrics = run(params)
+    root.info(f"📊 {metrics}")
+    root.info(f"📡 Telemetría/s simulado: EQC={metrics.eqc_telemetry_rate:.0f}, "
+              f"VQCs={metrics.vqc_telemetry_rate:.0f}, PoIs={metrics.poi_telemetry_rate:.0f}")
+    wire_bytes = {t: getattr(metrics, f"{t.lower()}_bytes") for t in ("HELLO", "HELLO_ACK", "ASSIGN", "DELIVER", "DELIVER_ACK", "ANNOUNCE", "BID")}
+    root.info("📶 Bytes enviados por tipo (" + params.wire_format + "): " + ", ".join(
+        f"{t}={b} ({b / metrics.sim_time:.0f} B/s)" for t, b in wire_bytes.items()))
+    root.info(f"⚡ {metrics.sim_time:.1f} s simulados en {metrics.wall_time:.2f} s reales "
+              f"({metrics.sim_speed:.1f} sim-s/s)")
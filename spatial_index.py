@@ -0,0 +1,88 @@
+"""
+Uniform-grid spatial index over PoI coordinates:
+- Built once from the PoI (x, y) coordinates and never modified afterwards.
+- within(x, y, r) answers "PoIs within r of (x, y)" by visiting only the
+  grid cells the query disc overlaps, so its cost follows the number of
+  nearby PoIs instead of the total PoI count.
+- nearest(x, y, r) resolves a position to the closest PoI within r
+  (camera detections → PoI, see EQCProtocol._match_detections).
+- near_segment(x0, y0, x1, y1, r) answers "PoIs within r of the segment",
+  i.e. swept by a disc of radius r moving between two positions.
+- The grids shared by a run live in the PoI registry (poi_registry.py).
+"""
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class PoIGrid:
+    """Rejilla uniforme de celdas `cell`×`cell` con los índices de PoI de cada celda."""
+
+    def __init__(self, xy: Sequence[Tuple[float, float]], cell: float):
+        self.xy = [(float(x), float(y)) for x, y in xy]
+        self.cell = float(cell)
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, (x, y) in enumerate(self.xy):
+            cells.setdefault(self._cell_of(x, y), []).append(i)
+        self._cells = {k: tuple(v) for k, v in cells.items()}
+
+    def _cell_of(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell), math.floor(y / self.cell)
+
+    def within(self, x: float, y: float, r: float) -> List[int]:
+        """
+        Índices de los PoIs a distancia (x, y) <= r, en orden creciente
+        (el orden importa: el buffer discovered se llena en ese orden).
+        """
+        cx0, cy0 = self._cell_of(x - r, y - r)
+        cx1, cy1 = self._cell_of(x + r, y + r)
+        r2 = r * r
+        hits = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for i in self._cells.get((cx, cy), ()):
+                    px, py = self.xy[i]
+                    if (px - x) ** 2 + (py - y) ** 2 <= r2:
+                        hits.append(i)
+        hits.sort()
+        return hits
+
+    def near_segment(self, x0: float, y0: float, x1: float, y1: float, r: float) -> List[int]:
+        """
+        Índices de los PoIs a distancia <= r del segmento (x0, y0)→(x1, y1),
+        en orden creciente: lo que detecta un sensor de radio r que se mueve
+        entre dos muestras de telemetría.
+        """
+        cx0, cy0 = self._cell_of(min(x0, x1) - r, min(y0, y1) - r)
+        cx1, cy1 = self._cell_of(max(x0, x1) + r, max(y0, y1) + r)
+        r2 = r * r
+        hits = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for i in self._cells.get((cx, cy), ()):
+                    if segment_dist2(self.xy[i], (x0, y0), (x1, y1)) <= r2:
+                        hits.append(i)
+        hits.sort()
+        return hits
+
+    def nearest(self, x: float, y: float, r: float) -> Optional[int]:
+        """Índice del PoI más cercano a (x, y) dentro de r, o None."""
+        cx0, cy0 = self._cell_of(x - r, y - r)
+        cx1, cy1 = self._cell_of(x + r, y + r)
+        best, best_d2 = None, r * r
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for i in self._cells.get((cx, cy), ()):
+                    px, py = self.xy[i]
+                    d2 = (px - x) ** 2 + (py - y) ** 2
+                    if d2 < best_d2 or (d2 == best_d2 and (best is None or i < best)):
+                        best, best_d2 = i, d2
+        return best
+
+
+def segment_dist2(p: Sequence[float], a: Sequence[float], b: Sequence[float]) -> float:
+    """Distancia al cuadrado del punto p al segmento a→b (misma dimensión, 2D o 3D)."""
+    ab = [bi - ai for ai, bi in zip(a, b)]
+    ap = [pi - ai for ai, pi in zip(a, p)]
+    len2 = sum(c * c for c in ab)
+    t = 0.0 if len2 == 0 else min(1.0, max(0.0, sum(u * v for u, v in zip(ap, ab)) / len2))
+    return sum((c - t * d) ** 2 for c, d in zip(ap, ab))
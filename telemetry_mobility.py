@@ -0,0 +1,145 @@
+"""
+Mobility handler with per-protocol telemetry rates:
+- Moves nodes exactly like gradysim's MasslessMobilityHandler (one position
+  update every update_rate seconds for every node).
+- Telemetry is delivered per protocol class: every update (period 0), every
+  `period` seconds, or never (None, e.g. static PoI nodes that ignore it).
+- A period > 0 only throttles the protocol's own handle_telemetry: plugins
+  (MissionMobilityPlugin advances waypoints on telemetry) still get every
+  update, so the node flies exactly the same path. The protocol's position
+  is then up to one period old: the E-QC stamps the position it sends in
+  HELLO_ACK with the time of that sample, not the current time, so the V-QCs
+  do not read the lag as drift. `python telemetry_mobility.py` checks that
+  their eqc_offset stays at 0 with a throttled E-QC.
+- Counts the telemetry events handled by each node type's protocol, reported
+  per simulated second by telemetry_rates().
+"""
+import math
+import types
+from typing import Dict, Optional, Type
+
+from gradysim.protocol.interface import IProtocol
+from gradysim.protocol.messages.telemetry import Telemetry
+from gradysim.simulator.handler.mobility import MobilityConfiguration, MobilityHandler
+from gradysim.simulator.log import label_node
+from gradysim.simulator.node import Node
+
+
+class TelemetryRateMobilityHandler(MobilityHandler):
+
+    def __init__(self, configuration: MobilityConfiguration = MobilityConfiguration(),
+                 telemetry_periods: Optional[Dict[Type[IProtocol], Optional[float]]] = None):
+        """
+        telemetry_periods: periodo (s) de telemetría por clase de protocolo;
+        0 = en cada actualización de movilidad, None = sin telemetría. Las
+        clases que no aparecen reciben telemetría en cada actualización.
+        """
+        super().__init__(configuration)
+        self._periods = dict(telemetry_periods or {})
+        self._node_period: Dict[int, Optional[float]] = {}
+        self._node_type: Dict[int, str] = {}
+        self._next_due: Dict[int, float] = {}
+        self.telemetry_sent: Dict[str, int] = {}     # tipo de nodo → eventos de telemetría entregados
+
+    def register_node(self, node: Node):
+        super().register_node(node)
+        self._next_due[node.id] = 0.0
+        protocol = node.protocol_encapsulator.protocol
+        name = type(protocol).__name__
+        self._node_type[node.id] = name
+        self.telemetry_sent.setdefault(name, 0)
+        period = self._periods.get(type(protocol), 0.0)
+        self._node_period[node.id] = period
+        if period:
+            self._throttle(node.id, protocol, period)
+
+    def _throttle(self, node_id: int, protocol: IProtocol, period: float) -> None:
+        """
+        Sustituye handle_telemetry del protocolo por una versión que sólo lo
+        llama cada `period` s. Se instala antes de initialize(), así los
+        plugins que el protocolo cree después (dispatcher de gradysim) quedan
+        por delante en la cadena y siguen recibiendo cada actualización.
+        """
+        inner = protocol.handle_telemetry
+
+        def handle_telemetry(_instance: IProtocol, telemetry: Telemetry) -> None:
+            now = self._event_loop.current_time
+            if now + 1e-9 < self._next_due[node_id]:
+                return
+            self._next_due[node_id] = now + period
+            self.telemetry_sent[self._node_type[node_id]] += 1
+            inner(telemetry)
+
+        protocol.handle_telemetry = types.MethodType(handle_telemetry, protocol)
+
+    def _update_movement(self):
+        now = self._event_loop.current_time
+        step = self._configuration.update_rate
+        for node_id, node in self.nodes.items():
+            # Movimiento: idéntico a MasslessMobilityHandler
+            if node_id in self.targets:
+                target = self.targets[node_id]
+                current_position = node.position
+                target_vector = (target[0] - current_position[0],
+                                 target[1] - current_position[1],
+                                 target[2] - current_position[2])
+                movement_multiplier = self.speeds[node_id] * step
+                distance_delta = math.sqrt(target_vector[0] ** 2 + target_vector[1] ** 2 + target_vector[2] ** 2)
+                if movement_multiplier >= distance_delta:
+                    node.position = (target[0], target[1], target[2])
+                else:
+                    k = movement_multiplier / distance_delta
+                    node.position = (current_position[0] + target_vector[0] * k,
+                                     current_position[1] + target_vector[1] * k,
+                                     current_position[2] + target_vector[2] * k)
+
+            # Telemetría: en cada actualización salvo a los tipos sin telemetría;
+            # con periodo > 0 la filtra _throttle, después de los plugins
+            period = self._node_period[node_id]
+            if period is None:
+                continue
+            if not period:
+                self.telemetry_sent[self._node_type[node_id]] += 1
+
+            telemetry = Telemetry(current_position=node.position)
+            self._event_loop.schedule_event(
+                now,
+                (lambda n, t: lambda: n.protocol_encapsulator.handle_telemetry(t))(node, telemetry),
+                label_node(node) + " handle_telemetry"
+            )
+
+        self._event_loop.schedule_event(now + step, self._update_movement, "Mobility")
+
+    def telemetry_rates(self, sim_time: float) -> Dict[str, float]:
+        """Eventos de telemetría entregados por tipo de nodo y segundo simulado."""
+        if sim_time <= 0:
+            return {name: 0.0 for name in self.telemetry_sent}
+        return {name: count / sim_time for name, count in self.telemetry_sent.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+    import logging
+    import sys
+
+    from run_simulation import RunParams, simulate
+
+    parser = argparse.ArgumentParser(description="Telemetría del EQC espaciada: los VQCs no deben ver desvío")
+    parser.add_argument('--periods', type=float, nargs='+', default=[0.0, 0.5, 1.0],
+                        help='Periodos (s) de telemetría del EQC')
+    parser.add_argument('--seed', type=int, default=100)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    ok = True
+    for period in args.periods:
+        params = RunParams(seed=args.seed, num_pois=50, num_vqcs=5, buffer_size=3, speed=5.0,
+                           camera_reach=15.0, eqc_telemetry=period)
+        sim, eqc_id, vqc_ids, _ = simulate(params)
+        vqcs = [sim.get_node(v).protocol_encapsulator.protocol for v in vqc_ids]
+        offset = max(abs(v.eqc_offset) for v in vqcs)
+        replans = sum(v.drift_replans for v in vqcs)
+        ok = ok and offset == 0.0
+        print(f"eqc_telemetry {period:g} s: |eqc_offset| máx {offset:.3f} s, replanificaciones por desvío {replans}"
+              f" → {'✅ PASS' if offset == 0.0 else '❌ FAIL'}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,322 @@
+"""
+Precomputed EQC trajectory model:
+- Built once per run from EQC_WAYPOINTS and EQC_SPEED with the cumulative
+  arrival time of every waypoint.
+- position(t) / heading(t) use a bisect over those times, O(log n).
+- LoopMission.RESTART is modelled: after the last waypoint the EQC flies back
+  to the first one and starts again, so any t past one lap wraps around.
+- The mission tolerance is modelled too: the EQC turns towards the next
+  waypoint as soon as it is within `tolerance` of the current one.
+- positions(ts) / headings(ts) are the vectorized variants for many times.
+- intercept(p, v, t0) solves exactly, segment by segment, the earliest time a
+  pursuer at p flying at v from t0 meets the EQC; intercepts(P, v, t0) does the
+  same for many pursuers in one NumPy call. `python trajectory.py` checks that
+  both agree, including at v == EQC_SPEED (the linear case).
+- phase_offset(pos, t, window) estimates how far ahead of (or behind) the
+  model an observed EQC position is, in seconds.
+- eqc_trajectory() returns the trajectory shared by every protocol of the run.
+"""
+import math
+from bisect import bisect_right
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import config
+
+Position = Tuple[float, float, float]
+
+
+class Trajectory:
+    """Recorrido poligonal a velocidad constante, opcionalmente cerrado en bucle."""
+
+    def __init__(self, waypoints: Sequence[Position], speed: float, loop: bool = True,
+                 tolerance: float = 0.0):
+        pts = [tuple(float(c) for c in wp) for wp in waypoints]
+        if tolerance > 0:
+            pts = _cut_corners(pts, tolerance)
+        if loop and len(pts) > 1:
+            # RESTART: vuelve al primer waypoint. El cierre no se recorta para
+            # que todas las vueltas sean iguales (error <= tolerance por vuelta).
+            pts.append(tuple(float(c) for c in waypoints[0]))
+        # tramos de longitud cero (p.ej. EQC_INIT_POS repetido) no aportan nada
+        dedup = [pts[0]]
+        for p in pts[1:]:
+            if p != dedup[-1]:
+                dedup.append(p)
+
+        self.loop = loop
+        self.speed = float(speed)
+        self.points = np.array(dedup, dtype=np.float64)                 # (k+1, 3)
+        seg = np.diff(self.points, axis=0)                              # (k, 3)
+        self.seg_vec = seg
+        self.seg_dur = np.linalg.norm(seg, axis=1) / self.speed         # (k,)
+        self.times = np.concatenate(([0.0], np.cumsum(self.seg_dur)))   # (k+1,)
+        self.seg_heading = np.arctan2(seg[:, 1], seg[:, 0]) if len(seg) else np.zeros(0)
+        self.lap_time = float(self.times[-1])
+
+        # copias en listas de Python: más rápidas que NumPy para consultas escalares
+        self._times: List[float] = self.times.tolist()
+        self._points: List[Position] = [tuple(p) for p in self.points.tolist()]
+        self._heading: List[float] = self.seg_heading.tolist()
+
+    def _local_time(self, t: float) -> float:
+        if t <= 0 or self.lap_time <= 0:
+            return 0.0
+        if self.loop:
+            return t % self.lap_time
+        return min(t, self.lap_time)
+
+    def _segment(self, t: float) -> int:
+        """Índice del tramo que se recorre en el instante local t."""
+        return min(bisect_right(self._times, t) - 1, len(self._heading) - 1)
+
+    def position(self, t: float) -> Position:
+        """Posición del EQC t segundos después del inicio de la patrulla."""
+        if not self._heading:
+            return self._points[0]
+        t = self._local_time(t)
+        i = self._segment(t)
+        a, b = self._points[i], self._points[i + 1]
+        frac = (t - self._times[i]) / (self._times[i + 1] - self._times[i])
+        return (
+            a[0] + frac * (b[0] - a[0]),
+            a[1] + frac * (b[1] - a[1]),
+            a[2] + frac * (b[2] - a[2]),
+        )
+
+    def heading(self, t: float) -> float:
+        """Rumbo en XY (radianes, atan2) del tramo que se recorre en t."""
+        if not self._heading:
+            return 0.0
+        return self._heading[self._segment(self._local_time(t))]
+
+    def _local_times(self, ts) -> np.ndarray:
+        ts = np.maximum(np.asarray(ts, dtype=np.float64), 0.0)
+        if self.lap_time <= 0:
+            return np.zeros_like(ts)
+        return np.mod(ts, self.lap_time) if self.loop else np.minimum(ts, self.lap_time)
+
+    def _segments(self, local: np.ndarray) -> np.ndarray:
+        idx = np.searchsorted(self.times, local, side="right") - 1
+        return np.clip(idx, 0, len(self.seg_dur) - 1)
+
+    def positions(self, ts) -> np.ndarray:
+        """Versión vectorizada de position(): array (N, 3) para N instantes."""
+        ts = np.asarray(ts, dtype=np.float64)
+        if not len(self.seg_dur):
+            return np.broadcast_to(self.points[0], ts.shape + (3,)).copy()
+        local = self._local_times(ts)
+        i = self._segments(local)
+        frac = (local - self.times[i]) / self.seg_dur[i]
+        return self.points[i] + frac[..., None] * self.seg_vec[i]
+
+    def headings(self, ts) -> np.ndarray:
+        """Versión vectorizada de heading()."""
+        ts = np.asarray(ts, dtype=np.float64)
+        if not len(self.seg_dur):
+            return np.zeros(ts.shape)
+        return self.seg_heading[self._segments(self._local_times(ts))]
+
+    # ——— Intercepción exacta ———
+    #
+    # En el tramo i, E(T) = A + u·(T - Ti). Con τ = T - t0 y w = A + u·(t0 - Ti) - p,
+    # |E(T) - p| = v·τ  ⇔  (u·u - v²)·τ² + 2(w·u)·τ + w·w = 0.
+    # Se recorren los tramos desde t0 y la primera raíz τ >= 0 que cae dentro
+    # del tramo es el encuentro más temprano.
+
+    def _horizon(self, p, v: float) -> float:
+        """
+        Cota de τ: si v > speed, v·τ - |E - p| >= v·τ - dmax, así que el
+        encuentro ocurre antes de dmax / v (dmax: vértice más lejano a p).
+        """
+        if v <= self.speed or v <= 0:
+            return self.lap_time * 2      # puede no haber solución: busca dos vueltas
+        d = np.linalg.norm(self.points - np.asarray(p, dtype=np.float64)[..., None, :], axis=-1)
+        return float(d.max()) / v
+
+    def unrolled(self, t0: float, t1: float):
+        """Tramos (índice, instante de inicio absoluto) que cubren [t0, t1]."""
+        k = len(self._heading)
+        if k == 0:
+            return
+        if self.loop:
+            lap0 = math.floor(max(t0, 0.0) / self.lap_time)
+            i = self._segment(self._local_time(t0))
+        else:
+            lap0, i = 0, self._segment(self._local_time(t0))
+        start = lap0 * self.lap_time + self._times[i]
+        while start <= t1:
+            yield i, start
+            start += self._times[i + 1] - self._times[i]
+            i += 1
+            if i == k:
+                if not self.loop:
+                    return
+                i = 0
+
+    def intercept(self, p: Sequence[float], v: float, t0: float) -> Optional[Tuple[float, Position]]:
+        """
+        Instante T >= t0 más temprano en que un nodo en `p` volando recto a `v`
+        desde t0 alcanza al EQC, y el punto de encuentro. None si no lo alcanza.
+        """
+        px, py, pz = p
+        v2 = v * v
+        horizon = t0 + self._horizon(p, v)
+        for i, start in self.unrolled(t0, horizon):
+            a, b = self._points[i], self._points[i + 1]
+            dur = self._times[i + 1] - self._times[i]
+            u = ((b[0] - a[0]) / dur, (b[1] - a[1]) / dur, (b[2] - a[2]) / dur)
+            lo = max(t0, start) - t0
+            hi = start + dur - t0
+            s0 = t0 - start
+            w = (a[0] + u[0] * s0 - px, a[1] + u[1] * s0 - py, a[2] + u[2] * s0 - pz)
+            qa = u[0] * u[0] + u[1] * u[1] + u[2] * u[2] - v2
+            qb = 2 * (w[0] * u[0] + w[1] * u[1] + w[2] * u[2])
+            qc = w[0] * w[0] + w[1] * w[1] + w[2] * w[2]
+            for tau in _roots(qa, qb, qc):
+                if lo - 1e-9 <= tau <= hi + 1e-9:
+                    tau = max(tau, 0.0)
+                    return t0 + tau, (w[0] + px + u[0] * tau, w[1] + py + u[1] * tau, w[2] + pz + u[2] * tau)
+        return None
+
+    def intercepts(self, ps, v: float, t0: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Versión por lotes de intercept() para N perseguidores (ps: (N, 3)).
+        Devuelve (T: (N,), puntos: (N, 3)); NaN donde no hay encuentro.
+        """
+        ps = np.atleast_2d(np.asarray(ps, dtype=np.float64))
+        n = len(ps)
+        horizon = t0 + max((self._horizon(p, v) for p in ps), default=0.0)
+        segs = list(self.unrolled(t0, horizon))
+        if not segs or n == 0:
+            return np.full(n, np.nan), np.full((n, 3), np.nan)
+
+        idx = np.array([i for i, _ in segs])
+        start = np.array([s for _, s in segs])                          # (K,)
+        dur = self.seg_dur[idx]
+        u = self.seg_vec[idx] / dur[:, None]                            # (K, 3)
+        lo = np.maximum(t0, start) - t0
+        hi = start + dur - t0
+        w = (self.points[idx] + u * (t0 - start)[:, None])[None, :, :] - ps[:, None, :]   # (N, K, 3)
+
+        qa = np.einsum("kj,kj->k", u, u) - v * v                        # (K,)
+        qb = 2 * np.einsum("nkj,kj->nk", w, u)                          # (N, K)
+        qc = np.einsum("nkj,nkj->nk", w, w)
+        qa = np.broadcast_to(qa, qb.shape)
+        disc = qb * qb - 4 * qa * qc
+        sq = np.sqrt(np.where(disc >= 0, disc, np.nan))
+        linear = np.abs(qa) < 1e-12                                     # v == EQC_SPEED: mismo umbral que _roots
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lin = np.where(qb != 0, -qc / qb, np.nan)
+            r1 = np.where(linear, lin, (-qb - sq) / (2 * qa))
+            r2 = np.where(linear, lin, (-qb + sq) / (2 * qa))
+        tau = np.fmin(_in_range(r1, lo, hi), _in_range(r2, lo, hi))     # raíz válida más pequeña
+        found = ~np.isnan(tau)
+        first = np.argmax(found, axis=1)                                # primer tramo con raíz
+        rows = np.arange(n)
+        ok = found[rows, first]
+        tau_k = np.maximum(tau[rows, first], 0.0)
+        T = np.where(ok, t0 + tau_k, np.nan)
+        pts = ps + w[rows, first] + u[first] * tau_k[:, None]
+        pts[~ok] = np.nan
+        return T, pts
+
+
+    def phase_offset(self, pos: Sequence[float], t: float, window: float) -> float:
+        """
+        Desfase dt (|dt| <= window) tal que position(t + dt) es el punto de la
+        trayectoria más cercano a `pos`: dt > 0 si el EQC real va adelantado
+        respecto al modelo (p.ej. por la tolerancia al cambiar de waypoint).
+        """
+        best_dt, best_d2 = 0.0, math.inf
+        for i, start in self.unrolled(t - window, t + window):
+            a, b = self._points[i], self._points[i + 1]
+            dur = self._times[i + 1] - self._times[i]
+            ab = (b[0] - a[0], b[1] - a[1], b[2] - a[2])
+            ap = (pos[0] - a[0], pos[1] - a[1], pos[2] - a[2])
+            frac = (ap[0] * ab[0] + ap[1] * ab[1] + ap[2] * ab[2]) / (dur * self.speed) ** 2
+            s = min(max(frac * dur, 0.0, t - window - start), dur, t + window - start)
+            q = s / dur
+            d2 = sum((a[k] + q * ab[k] - pos[k]) ** 2 for k in range(3))
+            if d2 < best_d2:
+                best_dt, best_d2 = start + s - t, d2
+        return best_dt
+
+
+def _cut_corners(pts: List[Position], tol: float) -> List[Position]:
+    """
+    Recorrido real de MissionMobilityPlugin: cada waypoint se da por alcanzado
+    a `tol` metros, y desde ahí se vuela recto hacia el siguiente.
+    """
+    out = [pts[0]]
+    for w in pts[1:]:
+        cur = out[-1]
+        d = (w[0] - cur[0], w[1] - cur[1], w[2] - cur[2])
+        length = math.sqrt(d[0] ** 2 + d[1] ** 2 + d[2] ** 2)
+        if length > tol:
+            f = (length - tol) / length
+            out.append((cur[0] + f * d[0], cur[1] + f * d[1], cur[2] + f * d[2]))
+    return out
+
+
+def _roots(a: float, b: float, c: float) -> List[float]:
+    """Raíces reales de a·x² + b·x + c, en orden creciente."""
+    if abs(a) < 1e-12:
+        return [-c / b] if b != 0 else []
+    disc = b * b - 4 * a * c
+    if disc < 0:
+        return []
+    sq = math.sqrt(disc)
+    return sorted(((-b - sq) / (2 * a), (-b + sq) / (2 * a)))
+
+
+def _in_range(r: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    return np.where((r >= lo - 1e-9) & (r <= hi + 1e-9), r, np.nan)
+
+
+_shared: Optional[Tuple[Sequence[Position], Tuple[float, float], Trajectory]] = None
+
+
+def eqc_trajectory() -> Trajectory:
+    """
+    Trayectoria compartida del EQC (EQC_WAYPOINTS a EQC_SPEED, en bucle, con
+    la tolerancia de su misión). Se reconstruye sólo si cambia alguno.
+    """
+    global _shared
+    key = (config.EQC_SPEED, config.EQC_WP_TOLERANCE)
+    if _shared is None or _shared[0] is not config.EQC_WAYPOINTS or _shared[1] != key:
+        _shared = (config.EQC_WAYPOINTS, key,
+                   Trajectory(config.EQC_WAYPOINTS, config.EQC_SPEED, loop=True,
+                              tolerance=config.EQC_WP_TOLERANCE))
+    return _shared[2]
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="intercepts() por lotes frente a intercept() escalar")
+    parser.add_argument('--points', type=int, default=200)
+    parser.add_argument('--speeds', type=float, nargs='+', default=[5.0, config.EQC_SPEED, 25.0],
+                        help='Velocidades del perseguidor (incluye EQC_SPEED: caso lineal)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    traj = eqc_trajectory()
+    ps = np.column_stack([rng.uniform(0, config.L, (args.points, 2)), np.full(args.points, 7.0)])
+    ok = True
+    for v in args.speeds:
+        t0 = float(rng.uniform(0, traj.lap_time))
+        T, pts = traj.intercepts(ps, v, t0)
+        bad = 0
+        for k, p in enumerate(ps):
+            hit = traj.intercept(tuple(p), v, t0)
+            if hit is None:
+                bad += not np.isnan(T[k])
+            else:
+                bad += not (abs(T[k] - hit[0]) <= 1e-6 and np.allclose(pts[k], hit[1], atol=1e-6))
+        ok = ok and bad == 0
+        print(f"v = {v:g} m/s: {bad}/{args.points} discrepancias → {'✅ PASS' if bad == 0 else '❌ FAIL'}")
+    sys.exit(0 if ok else 1)
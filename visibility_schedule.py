@@ -0,0 +1,115 @@
+"""
+Analytic visibility schedule of the E-QC camera:
+- Built before the run from the E-QC patrol (trajectory.py: EQC_WAYPOINTS,
+  EQC_SPEED, waypoint tolerance) and the camera reach R_CAMERA.
+- For every PoI, the first time it comes within camera reach is solved
+  exactly, segment by segment. The times are kept sorted, so the assign timer
+  gets the PoIs that became visible in its interval with one searchsorted
+  instead of taking a picture.
+- never_covered lists the PoIs the patrol never brings into camera reach.
+- Only valid for cameras whose cone does not filter (camera_theta >= 180°,
+  the E-QC camera); narrower cones need the picture-based detection.
+- `python visibility_schedule.py` cross-validates the schedule against the
+  take_picture() detections of a node-based run.
+"""
+import argparse
+import logging
+from typing import Tuple
+
+import numpy as np
+
+import config
+from trajectory import Trajectory
+
+
+class VisibilitySchedule:
+    """Instante en que cada PoI (a ras de suelo) entra por primera vez en el alcance de la cámara."""
+
+    def __init__(self, trajectory: Trajectory, points, reach: float, horizon: float):
+        pts = np.asarray(points, dtype=np.float64).reshape(len(points), -1)
+        p3 = np.zeros((len(pts), 3))
+        p3[:, :pts.shape[1]] = pts
+        self.reach = float(reach)
+        self.horizon = float(horizon)
+        self.first_seen = self._solve(trajectory, p3)           # (P,) inf si nunca
+        seen = np.flatnonzero(np.isfinite(self.first_seen))
+        order = np.argsort(self.first_seen[seen], kind="stable")
+        self.order = seen[order]                                # índices por instante de aparición
+        self.times = self.first_seen[self.order]
+        self.never_covered = np.flatnonzero(~np.isfinite(self.first_seen))
+
+    def _solve(self, traj: Trajectory, p3: np.ndarray) -> np.ndarray:
+        # En el tramo k, E(s) = A + u·s (s en [0, dur]); el PoI entra en el alcance
+        # en la primera raíz de |A + u·s - p|² = reach², o en s = 0 si ya estaba dentro.
+        first = np.full(len(p3), np.inf)
+        r2 = self.reach * self.reach
+        for i, start in traj.unrolled(0.0, self.horizon):
+            todo = np.flatnonzero(np.isinf(first))
+            if not len(todo):
+                break
+            dur = float(traj.seg_dur[i])
+            u = traj.seg_vec[i] / dur
+            w = traj.points[i] - p3[todo]                       # (n, 3)
+            a = float(u @ u)
+            b = 2 * (w @ u)
+            c = np.einsum("ij,ij->i", w, w) - r2
+            disc = b * b - 4 * a * c
+            with np.errstate(invalid="ignore"):
+                s_in = (-b - np.sqrt(disc)) / (2 * a)
+            s = np.where(c <= 0, 0.0, s_in)
+            hit = (c <= 0) | ((disc >= 0) & (s_in >= 0) & (s_in <= dur))
+            t = start + s
+            hit &= t <= self.horizon
+            first[todo[hit]] = t[hit]
+        return first
+
+    def between(self, t0: float, t1: float) -> np.ndarray:
+        """Índices (crecientes) de los PoIs que aparecen en (t0, t1]."""
+        lo = np.searchsorted(self.times, t0, side="right") if t0 >= 0 else 0
+        hi = np.searchsorted(self.times, t1, side="right")
+        return np.sort(self.order[lo:hi])
+
+
+def cross_validate(params) -> Tuple[int, int, int, float]:
+    """
+    Compara el calendario con un run con nodos PoI y fotos (take_picture):
+    devuelve (PoIs vistos por ambos, sólo por el calendario, sólo por las
+    fotos, máximo adelanto de la foto sobre el calendario en s).
+    Cada foto en t debe ver PoIs con first_seen <= t; el calendario además
+    ve los que entran y salen del alcance entre dos fotos.
+    """
+    from dataclasses import replace
+    from poi_registry import registry
+    from run_simulation import simulate
+    from trajectory import eqc_trajectory
+
+    params = replace(params, poi_nodes=True, camera_schedule=False)
+    sim, eqc_id, _, _ = simulate(params)
+    eqc = sim.get_node(eqc_id).protocol_encapsulator.protocol
+    reg = registry()
+    sched = VisibilitySchedule(eqc_trajectory(), reg.coords, config.R_CAMERA, eqc.provider.current_time())
+
+    by_picture = {i: eqc.detect_ts[i] for i in np.flatnonzero(~np.isnan(eqc.detect_ts)).tolist()}
+    by_schedule = set(np.flatnonzero(np.isfinite(sched.first_seen)).tolist())
+    both = by_schedule & by_picture.keys()
+    early = max((sched.first_seen[i] - by_picture[i] for i in both), default=0.0)
+    return len(both), len(by_schedule - by_picture.keys()), len(by_picture.keys() - by_schedule), float(early)
+
+
+if __name__ == "__main__":
+    from run_simulation import RunParams
+
+    parser = argparse.ArgumentParser(description="Valida el calendario de visibilidad contra take_picture()")
+    parser.add_argument('--seeds', type=int, nargs='+', default=[100, 101, 102])
+    parser.add_argument('--num_pois', type=int, default=100)
+    parser.add_argument('--camera_reach', type=float, nargs='+', default=[10.0, 15.0, 20.0])
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"{'seed':>5} {'reach':>6} {'ambos':>6} {'sólo calendario':>16} {'sólo fotos':>11} {'adelanto foto (s)':>18}")
+    for seed in args.seeds:
+        for reach in args.camera_reach:
+            p = RunParams(seed=seed, num_pois=args.num_pois, num_vqcs=5, buffer_size=5,
+                          speed=5.0, camera_reach=reach, headless=True)
+            both, only_sched, only_pic, early = cross_validate(p)
+            print(f"{seed:>5} {reach:>6} {both:>6} {only_sched:>16} {only_pic:>11} {early:>18.3f}")
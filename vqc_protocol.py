@@ -1,14 +1,38 @@
 """
 Visiting Quadcopter (V-QC) protocol:
 - Initial random roaming.
+- Satellite mode: flies to the exact intercept with the EQC and replans when
+  that mission is due to end, or when the EQC drifts from its predicted track.
 - Receives ASSIGN and visits PoIs.
-- Locally detects PoI IDs and delivers them back.
+- Locally detects PoI IDs along the path flown between two telemetry samples
+  (not only at the sampled positions) and delivers them back.
+- PoIs are registry indices. next2visit and discovered are bounded buffers
+  (capacity M) and visited a bitset, all with O(1) membership (poi_buffers.py);
+  ids and labels only appear in the logs.
+- next2visit is flown in the order of route_planner.py (nearest neighbour +
+  2-opt from the current position, new targets inserted incrementally); the
+  distance saved against arrival order is logged per mission.
+- Rendezvous mode (config.RENDEZVOUS): while visiting, as soon as the
+  discovered buffer fills or holds a PoI of urgency >= RENDEZVOUS_URGENCY,
+  the V-QC interrupts the visit, flies to the E-QC's predicted position to
+  deliver and then resumes the remaining targets.
+- Relay mode (config.RELAY, store-carry-forward): a V-QC holding PoIs
+  offers them every HELLO period (RELAY_OFFER with its ETA to the E-QC); a
+  neighbour that would reach the E-QC RELAY_MARGIN seconds earlier accepts
+  and takes custody of the bundle (RELAY), deduplicated by PoI and up to M
+  carried PoIs, and delivers it with the original discoverer of each PoI
+  (RELAY_DELIVER). The sender keeps the bundle until the RELAY_ACK listing the
+  PoIs the neighbour now holds, and releases only those.
+- With config.ASSIGNMENT_POLICY = "auction" the targets come from the
+  distributed bundle auction (auction.py) instead of the EQC's ASSIGNs: the
+  V-QC bids every AUCTION_PERIOD, broadcasts its BID table to its
+  neighbours when it changes (or every AUCTION_HEARTBEAT) and flies to the
+  PoIs it keeps winning.
 """
 
-import json
 import math
 import logging
-from typing import List, Tuple, Dict
+from typing import Dict, List, Tuple
 
 from gradysim.protocol.interface import IProtocol
 from gradysim.protocol.messages.communication import CommunicationCommand, CommunicationCommandType
@@ -18,21 +42,51 @@ from gradysim.protocol.plugin.mission_mobility import MissionMobilityPlugin, Mis
 
 import config
 from config import EQC_INIT_POS
-
-import math
-from scipy.spatial.distance import euclidean
+from poi_registry import registry
+from wire import WireCodec
+from poi_buffers import PoIBuffer, PoISet
+from spatial_index import segment_dist2
+from trajectory import eqc_trajectory
+from auction import BundleAuction
+import route_planner
 
 class VQCProtocol(IProtocol):
     def initialize(self) -> None:
         self.id = self.provider.get_id()
         self.log = logging.getLogger(f"VQC-{self.id}")
+        self.wire = WireCodec(config.WIRE_FORMAT, config.WIRE_STRICT)     # codec de mensajes (binario, JSON u objetos)
 
         self.pos = (0.0, 0.0, 4.0)
-        self.next2visit: List[Tuple[Tuple[float, float], int]] = []
-        self.discovered: List[Dict[str,str]] = []
-        self.visited: List[str] = []
+        self._has_pos = False          # aún sin telemetría: no hay tramo recorrido
+        self.next2visit = PoIBuffer(config.M)     # PoIs asignados por visitar, en orden de visita
+        self.discovered = PoIBuffer(config.M)     # PoIs detectados pendientes de DELIVER_ACK
+        self.visited = PoISet()                   # PoIs entregados (con ACK)
+        self.discovered_at: Dict[int, float] = {} # PoI de discovered → instante de descubrimiento
+        # Relevo entre VQCs (RELAY)
+        self.carried = PoIBuffer(config.M)        # PoIs de otros VQCs en custodia (acotado como discovered)
+        self.carried_meta: Dict[int, Tuple[int, float]] = {}   # PoI en custodia → (descubridor, instante)
+        self.relayed_out = PoISet()               # PoIs propios cedidos (no se vuelven a detectar)
+        self._relay_eta = None                    # ETA de la última RELAY_OFFER aún sin ceder
+        self._handing: Dict[int, int] = {}        # PoI cedido sin RELAY_ACK → VQC receptor
+        self.relayed_in = 0                       # PoIs recibidos en custodia
+        self.e2e_latencies: List[Tuple[int, float]] = []   # (PoI, descubrimiento → DELIVER_ACK en s)
         self.delivering = False
         self.state = "satellite"   
+        self.intercept_time = 0.0      # instante previsto del encuentro con el EQC
+        self.eqc_offset = 0.0          # desfase (s) del EQC real respecto a la trayectoria modelo
+        self._route: List[Tuple[float, float, float]] = []   # waypoints de la misión en curso
+        self._replan_pending = False   # hay como mucho un timer "replan" pendiente
+        # Contadores de eventos (por segundo simulado en finish)
+        self.timer_events   = 0
+        self.mission_starts = 0
+        self.drift_replans  = 0
+        self.route_plans    = 0              # rutas planificadas (ROUTE_PLANNER = "2opt")
+        self.route_saved    = 0.0            # metros ahorrados frente al orden de llegada
+        self.rendezvous_trips = 0            # vueltas al EQC para entregar (RENDEZVOUS)
+        # Subasta distribuida (sólo con ASSIGNMENT_POLICY = "auction")
+        self.auction = BundleAuction(self.id) if config.ASSIGNMENT_POLICY == "auction" else None
+        self.alloc_latencies: List[Tuple[int, float]] = []   # (PoI, detección → compromiso en s)
+        self._last_bid = -math.inf                # último BID difundido
         self.last_assign = {
             "eqc_pos":  EQC_INIT_POS,                 # (0.0, 0.0, 7.0)
             "eqc_time": self.provider.current_time()         # t = 0.0 ó tiempo de inicio
@@ -53,7 +107,8 @@ class VQCProtocol(IProtocol):
         self.log.info("Modo satélite iniciado")
         t0 = self.provider.current_time()
         self.provider.schedule_timer("hello", t0+1)
-        self.provider.schedule_timer("check_roam", t0+1)
+        if self.auction:
+            self.provider.schedule_timer("bid", t0 + config.AUCTION_PERIOD)
 
         # Métricas de descubrimiento
         self.disc_casual   = 0   # fuera de misión
@@ -66,56 +121,37 @@ class VQCProtocol(IProtocol):
             "handle_packet.HELLO_ACK": False,
             "handle_packet.DELIVER_ACK": False,
         }
+        if self.auction:
+            del self._exec["handle_packet.ASSIGN"]     # con subasta el EQC no envía ASSIGN
         
     def predict_eqc_position(self, t: float) -> Tuple[float, float, float]:
         """
-        Predice la posición del EQC a t segundos desde el inicio de la simulación,
-        interpolando linealmente entre waypoints.
+        Predice la posición del EQC a t segundos desde el inicio de la simulación
+        con la trayectoria precomputada (bisect sobre tiempos acumulados; para t
+        mayor que una vuelta, el EQC reinicia la patrulla: LoopMission.RESTART),
+        corregida con el desfase observado en los HELLO_ACK.
         """
-        waypoints = config.EQC_WAYPOINTS
-        v_eqc = config.EQC_SPEED
-
-        # calcular duración de cada tramo
-        durations = [euclidean(a, b) / v_eqc
-                    for a, b in zip(waypoints, waypoints[1:])]
-        total = sum(durations)
-
-        if t <= 0:
-            return waypoints[0]
-        if t >= total:
-            return waypoints[-1]
-
-        elapsed = 0.0
-        for (a, b), dur in zip(zip(waypoints, waypoints[1:]), durations):
-            if elapsed + dur >= t:
-                frac = (t - elapsed) / dur
-                return (
-                    a[0] + frac * (b[0] - a[0]),
-                    a[1] + frac * (b[1] - a[1]),
-                    a[2] + frac * (b[2] - a[2]),
-                )
-            elapsed += dur
+        return eqc_trajectory().position(t + self.eqc_offset)
 
-        return waypoints[-1]
     # --- 2) Método auxiliar: calcular punto de intercepción predictiva ---
-    def compute_intercept(self) -> Tuple[float, float, float]:
+    def compute_intercept(self, formation: bool = True) -> Tuple[float, float, float]:
         """
-        Itera para encontrar Δt tal que el VQC llegue justo donde estará el EQC.
+        Punto de encuentro exacto con el EQC: el instante T más temprano en que
+        el VQC, volando recto a VQC_SPEED desde su posición, alcanza la
+        trayectoria del EQC (resuelto tramo a tramo, ver Trajectory.intercept).
+        formation=False: el punto del EQC, sin el hueco del VQC en la V.
         """
         now = self.provider.current_time()
-        pos_vqc = self.pos                         # usa tu posición interna
-        v_vqc = config.VQC_SPEED
-
-        # estimación inicial: EQC en t = now
-        pred = self.predict_eqc_position(now)
-        dt = euclidean(pos_vqc, pred) / v_vqc
-
-        # refinar con 5 iteraciones para converger
-        for _ in range(5):
-            T = now + dt
-            pred = self.predict_eqc_position(T)
-            dt = euclidean(pos_vqc, pred) / v_vqc
-
+        traj = eqc_trajectory()
+        t_model = now + self.eqc_offset          # tiempo en la trayectoria modelo
+        hit = traj.intercept(self.pos, config.VQC_SPEED, t_model)
+        if hit is None:
+            # el EQC no es alcanzable (VQC más lento): ir a su posición actual
+            hit = (t_model, traj.position(t_model))
+        T, pred = hit
+        self.intercept_time = T - self.eqc_offset
+        if not formation:
+            return (pred[0], pred[1], 4.0)
 
         angle   = math.radians(150)  # apertura de 30°
         spacing = 3.0               # 1 m entre cada “paso” de la V
@@ -125,10 +161,8 @@ class VQCProtocol(IProtocol):
         side  = -1 if (self.id % 2) != 0 else 1
         depth = (self.id + 1) // 2
 
-        # Aproximar rumbo (heading) del EQC en este instante
-        curr  = self.predict_eqc_position(now)
-        fut   = self.predict_eqc_position(now + 0.1)
-        heading = math.atan2(fut[1] - curr[1], fut[0] - curr[0])
+        # Rumbo (heading) del EQC en el instante del encuentro
+        heading = traj.heading(T)
 
         # Vector de offset en V
         dx = spacing * depth * math.cos(heading + side * angle)
@@ -137,6 +171,10 @@ class VQCProtocol(IProtocol):
         # Punto final: intercept + offset en XY, misma Z
         return (pred[0] + dx, pred[1] + dy, pred[2])
 
+    def _slot_distance(self) -> float:
+        """Distancia (m) de su hueco en la V al EQC: 3 m por fila, fila ceil(id/2) (como compute_intercept)."""
+        return 3.0 * ((self.id + 1) // 2)
+
     # --- 3) Mantenimiento de modo satélite con intercepción dinámica ---
     def maintain_satellite_mode(self):
         """
@@ -149,11 +187,66 @@ class VQCProtocol(IProtocol):
 
         # 2) lanzar misión hacia ese punto SIN el argumento 'loop'
         #    (usa la configuración que ya diste en MissionMobilityConfiguration)
-        self.mission.start_mission([intercept])
+        self._start_mission([intercept])
 
         # 3) cambiar estado
         self.state = "satellite"
 
+    # --- 4) Replanificación por eventos ---
+    def _start_mission(self, waypoints: List[Tuple[float, float, float]]) -> None:
+        """Lanza la misión y programa la replanificación para su llegada prevista."""
+        self.mission.start_mission(waypoints)
+        self._route = list(waypoints)
+        self.mission_starts += 1
+        self._schedule_replan()
+
+    def _route_eta(self) -> float:
+        """Segundos que le quedan a la misión: posición → waypoint actual → … → último."""
+        i = self.mission.current_waypoint
+        if i is None or not self._route:
+            return 0.0
+        pts = [self.pos] + self._route[i:]
+        return sum(math.dist(a, b) for a, b in zip(pts, pts[1:])) / config.VQC_SPEED
+
+    def _schedule_replan(self) -> None:
+        # En formación la misión dura ~0 s: esperar a que el EQC se haya movido
+        # SAT_DRIFT_THRESHOLD metros en vez de replanificar en bucle.
+        dt = max(self._route_eta(), config.SAT_DRIFT_THRESHOLD / config.EQC_SPEED)
+        # No cancelar desde el propio "replan": gradysim borra el id del timer
+        # después de handle_timer y fallaría si ya no está.
+        if self._replan_pending:
+            self.provider.cancel_timer("replan")
+        self.provider.schedule_timer("replan", self.provider.current_time() + dt)
+        self._replan_pending = True
+
+    def _check_drift(self) -> None:
+        """
+        Compara la posición del EQC del último HELLO_ACK con la prevista. Si se
+        aleja más de SAT_DRIFT_THRESHOLD, re-estima el desfase y, en modo
+        satélite, replanifica la intercepción en el acto.
+        """
+        traj = eqc_trajectory()
+        eqc_pos, eqc_time = self.last_assign["eqc_pos"], self.last_assign["eqc_time"]
+        t_model = eqc_time + self.eqc_offset
+        drift = math.dist(eqc_pos, traj.position(t_model))
+        if drift <= config.SAT_DRIFT_THRESHOLD:
+            return
+        window = 2 * drift / config.EQC_SPEED + 1.0
+        self.eqc_offset += traj.phase_offset(eqc_pos, t_model, window)
+        self.log.info(f"🧭 EQC desviado {drift:.2f} m de lo previsto → desfase {self.eqc_offset:+.2f} s")
+        if self.state == "satellite":
+            self.drift_replans += 1
+            self.maintain_satellite_mode()
+        elif self.state == "rendezvous":
+            self.drift_replans += 1
+            self._go_rendezvous()
+
+    @staticmethod
+    def _waypoint(idx: int) -> Tuple[float, float, float]:
+        """Punto de visita del PoI: sus coordenadas a la altura de vuelo del VQC."""
+        x, y = registry().xy[idx]
+        return (x, y, 4.0)
+
     def handle_telemetry(self, telemetry: Telemetry) -> None:
         self._exec["handle_telemetry"] = True
         in_mission = not self.mission.is_idle
@@ -161,69 +254,70 @@ class VQCProtocol(IProtocol):
         old = self.pos
         self.pos = telemetry.current_position
         self.log.debug(f"📡 Telemetry: from {old} to {self.pos}")
-
-        for coord3d, urg in list(self.next2visit):
-            dx, dy, dz = (
-                self.pos[0] - coord3d[0],
-                self.pos[1] - coord3d[1],
-                self.pos[2] - coord3d[2]
-            )
-            dist = math.sqrt(dx*dx + dy*dy + dz*dz)
-            self.log.debug(f"    Dist to {coord3d}: {dist:.2f} (tol={config.R_DETECT})")
-
-            if dist <= config.R_DETECT:
-                # encontramos el POI correspondiente:
-                poi = next(p for p in config.POIS
-                        if p["coord"] == (coord3d[0], coord3d[1])
-                        and p["urgency"] == urg)
-                poi_id    = poi["id"]
-                poi_label = poi["label"]
-
+        if not self._has_pos:
+            old, self._has_pos = self.pos, True   # self.pos inicial no es la posición real
+
+        # Detección continua sobre el tramo recorrido desde la telemetría anterior:
+        # PoIs a <= R_DETECT en XY del segmento old→pos (assigned y casual)
+        reg = registry()
+        nearby = reg.grid.near_segment(old[0], old[1], self.pos[0], self.pos[1], config.R_DETECT)
+        nearby_set = set(nearby)
+        r2 = config.R_DETECT * config.R_DETECT
+
+        for idx in list(self.next2visit):
+            if idx not in nearby_set:
+                continue
+            coord3d = self._waypoint(idx)
+            d2 = segment_dist2(coord3d, old, self.pos)     # distancia 3D mínima en el tramo
+            self.log.debug(f"    Dist to {coord3d}: {math.sqrt(d2):.2f} (tol={config.R_DETECT})")
+
+            if d2 <= r2:
                 # 1) no lo hayamos visitado ya
-                # 2) no esté ya en discovered (que ahora son dicts con clave "id")
-                already_discovered = any(d["id"] == poi_id for d in self.discovered)
-                if poi_id not in self.visited and not already_discovered:
-                    if len(self.discovered) < config.M:
+                # 2) no esté ya en discovered
+                if not self._known(idx):
+                    if not self.discovered.full:
                         # ➞ lo añadimos al buffer discovered
-                        self.discovered.append({"id": poi_id, "label": poi_label})
+                        self.discovered.add(idx)
+                        self.discovered_at[idx] = _ms(self.provider.current_time())
+                        if self.auction:
+                            self.auction.close(idx, self.provider.current_time())
 
-                        # ➞ CLASIFICAMOS: assigned si (coord3d, urg) estaba en next2visit
-                        entry = (coord3d, urg)
-                        if entry in self.next2visit:
+                        # ➞ CLASIFICAMOS: assigned si estaba en next2visit
+                        if idx in self.next2visit:
                             self.disc_assigned += 1
                             # ➞ lo quitamos de next2visit para no volver a contarlo
-                            self.next2visit.remove(entry)
+                            self.next2visit.discard(idx)
                             kind = "assigned"
                         else:
                             # (raro, pero por seguridad)
                             self.disc_casual += 1
                             kind = "casual"
 
-                        self.log.info(f"🔍 Local detect ({kind}): {poi_id} ({poi_label})")
+                        self.log.info(f"🔍 Local detect ({kind}): {reg.ids[idx]} ({reg.labels[idx]})")
                     else:
                         self.log.debug("Buffer discovered lleno")
                 # → Tras detectar uno assigned, puedes 'break' si solo esperas un PoI a la vez
                 # break
         # 2) detección casual cuando no estamos en misión:
         if not self.next2visit:
-            for poi in config.POIS:
-                px, py = poi["coord"]
-                dx, dy = self.pos[0] - px, self.pos[1] - py
-                dist = math.hypot(dx, dy)
-                if dist <= config.R_DETECT:
-                    poi_id    = poi["id"]
-                    poi_label = poi["label"]
-
-                    already_discovered = any(d["id"] == poi_id for d in self.discovered)
-                    if poi_id not in self.visited and not already_discovered:
-                        if len(self.discovered) < config.M:
-                            self.discovered.append({"id": poi_id, "label": poi_label})
-                            self.disc_casual += 1
-                            self.log.info(f"🔍 Casual detect: {poi_id} ({poi_label})")
-                        else:
-                            self.log.debug("Buffer discovered lleno")
+            for idx in nearby:
+                if not self._known(idx):
+                    if not self.discovered.full:
+                        self.discovered.add(idx)
+                        self.discovered_at[idx] = _ms(self.provider.current_time())
+                        if self.auction:
+                            self.auction.close(idx, self.provider.current_time())
+                        self.disc_casual += 1
+                        self.log.info(f"🔍 Casual detect: {reg.ids[idx]} ({reg.labels[idx]})")
+                    else:
+                        self.log.debug("Buffer discovered lleno")
+        if config.RENDEZVOUS and self.state == "visiting" and self._must_deliver():
+            self.rendezvous_trips += 1
+            self.log.info(f"📬 Vuelta al EQC para entregar: discovered={[reg.labels[i] for i in self.discovered]}")
+            self._go_rendezvous()
 
     def handle_timer(self, timer: str) -> None:
+        self.timer_events += 1
 
         if timer == "hello":
             self._exec["handle_timer.hello"] = True
@@ -236,7 +330,7 @@ class VQCProtocol(IProtocol):
                 }
                 cmd = CommunicationCommand(
                     CommunicationCommandType.BROADCAST,
-                    json.dumps(report)
+                    self.wire.encode(report)
                 )
                 self.provider.send_communication_command(cmd)
                 self.log.info(f"📣 DELIVER automático en HELLO: entregados {self.discovered}")
@@ -248,30 +342,42 @@ class VQCProtocol(IProtocol):
             free = config.M - len(self.next2visit)
             msg = {"type":"HELLO","v_id":self.id,"huecos":free,"position":list(self.pos)}
             self.log.debug(f"📤 HELLO payload: {msg}")
-            cmd = CommunicationCommand(CommunicationCommandType.SEND, json.dumps(msg),0)
+            cmd = CommunicationCommand(CommunicationCommandType.SEND, self.wire.encode(msg),0)
             self.provider.send_communication_command(cmd)
             self.log.info(f"📤 HELLO sent: free={free}")
+            if config.RELAY:
+                self._offer_relay()
             self.provider.schedule_timer("hello", self.provider.current_time()+1)
 
-        elif timer == "check_roam": #¿Estoy libre de misiones (mission.is_idle) y no estoy ya vagando de forma aleatoria (random._trip_ongoing)
-            self.log.debug(f"🔥 check_roam: idle={self.mission.is_idle}")
-            if self.mission.is_idle:
+        elif timer == "bid":
+            self._auction_round()
+            self.provider.schedule_timer("bid", self.provider.current_time() + config.AUCTION_PERIOD)
+
+        elif timer == "replan": # llegada prevista de la misión en curso
+            self._replan_pending = False
+            self.log.debug(f"🔥 replan: idle={self.mission.is_idle}")
+            if self.mission.is_idle and self.state == "rendezvous":
+                # En el punto previsto sin entregar todavía: reapuntar al EQC
+                self._go_rendezvous()
+            elif self.mission.is_idle:
                 if self.state == "visiting":
                     self.log.info("🏁 Fin de misión → modo satélite")
                     self.state = "satellite"
                 self.maintain_satellite_mode()
-                # si estoy en satellite y la misión idle, no hago nada
-            self.provider.schedule_timer("check_roam", self.provider.current_time()+0.1)
+            else:
+                # aún no ha llegado (telemetría discreta, tolerancia): reprogramar con lo que falta
+                self._schedule_replan()
 
     def handle_packet(self, message: str) -> None:
         self.log.debug(f"📥 handle_packet ASSIGN: {message}")
-        msg = json.loads(message)
+        msg = self.wire.decode(message)
 
         t = msg.get("type")
         
         if t == "ASSIGN":
             self._exec["handle_packet.ASSIGN"] = True
-            self.log.info(f"📥 ASSIGN received: {msg['pois']}")
+            reg = registry()
+            self.log.info(f"📥 ASSIGN received: {[reg.labels[p['idx']] for p in msg['pois']]}")
  
 #
 #
@@ -292,39 +398,35 @@ class VQCProtocol(IProtocol):
 #                self.log.info(f"📣 DELIVER inmediato en ASSIGN: {self.discovered}")
                 # NOTA: No borramos aquí; aguardamos al ACK
 
-            antiguos = list(self.next2visit)
-
-            self.next2visit.clear()
-            # 3) Cargar primero las nuevas tareas que envía el EQC
-            nuevos_ids = set()
-            for p in msg["pois"]:
-                x, y = p["coord"]
-                urg = p["urgency"]
-                coord3d = (x, y, 4.0)
-                self.next2visit.append((coord3d, urg))
-                nuevos_ids.add(p["label"])      # usa "label" o "id" según tu POIS
-            # 4) Volver a añadir las antiguas que no estén ya en los nuevos,
-            #    hasta completar la capacidad M
-            for coord3d, urg in antiguos:
-                # obtener el label según las coordenadas
-                label = next(poi["label"]
-                            for poi in config.POIS
-                            if poi["coord"] == (coord3d[0], coord3d[1]))
-                if label not in nuevos_ids and len(self.next2visit) < config.M:
-                    self.next2visit.append((coord3d, urg))
-
-            # 5) Si tras el merge no queda nada, reanudar roaming
-            if not self.next2visit:
-                self.log.info("🔄 ASSIGN vacío → sigo en modo satélite")
-                return
-                
-            # 6) Arrancar la misión guiada con la lista combinada
-            coords  = [coord for (coord, _) in self.next2visit]
-            self.log.info(f"🗺️ Waypoints combinados: {coords}")
-            self.state = "visiting"
-            self.mission.start_mission(coords)
+            self._merge_targets([p["idx"] for p in msg["pois"]])
             return
+
+        elif t == "ANNOUNCE":
+            if self.auction:
+                self.auction.learn(msg["pois"], self.provider.current_time())
+
+        elif t == "BID":
+            if self.auction:
+                dropped = self.auction.merge(msg["bids"], self.provider.current_time())
+                if dropped:
+                    self._drop_targets(dropped)
             
+        elif t == "RELAY_OFFER":
+            if config.RELAY:
+                self._accept_relay(msg)
+
+        elif t == "RELAY_ACCEPT":
+            if config.RELAY:
+                self._hand_over(msg)
+
+        elif t == "RELAY":
+            if config.RELAY:
+                self._take_custody(msg)
+
+        elif t == "RELAY_ACK":
+            if config.RELAY:
+                self._release(msg)
+
         elif t == "HELLO_ACK":
                 self._exec["handle_packet.HELLO_ACK"] = True
                 self.last_assign = {
@@ -333,26 +435,285 @@ class VQCProtocol(IProtocol):
                 }
                 self.log.info(f"✅ VQC-{self.id} recebeu HELLO_ACK, enviando DELIVER en {self.last_assign['eqc_pos']} t={self.last_assign['eqc_time']}")
                 self.send_deliver() 
+                self._check_drift()
 
         elif t == "DELIVER_ACK":
             self._exec["handle_packet.DELIVER_ACK"] = True
-            acked = msg.get("pids", [])  # lista de IDs como strings
-            self.log.info(f"📥 DELIVER_ACK recibido: {acked}")
+            acked = msg.get("pids", [])  # índices de PoI
+            reg = registry()
+            self.log.info(f"📥 DELIVER_ACK recibido: {[reg.ids[i] for i in acked]}")
+
+            now = self.provider.current_time()
+            for idx in acked:
+                if idx in self.discovered_at:
+                    self.e2e_latencies.append((idx, now - self.discovered_at.pop(idx)))
+                elif idx in self.carried_meta:
+                    self.e2e_latencies.append((idx, now - self.carried_meta.pop(idx)[1]))
+            self.discovered.discard_all(acked)
+            self.carried.discard_all(acked)
+            for idx in acked:
+                self._handing.pop(idx, None)
+            self.visited.update(acked)
+            if self.state == "rendezvous" and not self._must_deliver():
+                self._resume_visit()
+
+            self.log.debug(f"🗂️ discovered tras ACK: {[reg.ids[i] for i in self.discovered]}, "
+                           f"visited: {len(self.visited)}")
 
-            # Reemplaza tu loop antiguo por:
-            for poi_id in acked:
-                # quita cualquier dict con .["id"] == poi_id
-                self.discovered = [d for d in self.discovered if d["id"] != poi_id]
-                self.visited.append(poi_id)
+        else:
+            self.log.debug(f"⚠️ VQC-{self.id} recebeu mensagem desconhecida: {t}")
 
-            self.log.debug(f"🗂️ discovered tras ACK: {self.discovered}, visited: {self.visited}")
+    def _merge_targets(self, new: List[int]) -> None:
+        """Nuevos PoIs a visitar (ASSIGN o subasta): primero los nuevos, luego los que quedaban."""
+        reg = registry()
+        antiguos = list(self.next2visit)
+
+        self.next2visit.clear()
+        # 3) Cargar primero las nuevas tareas
+        for idx in new:
+            if not self.next2visit.add(idx) and self.next2visit.full:
+                self.log.warning(f"⚠️ Asignación excede el buffer (M={config.M}): descarto {reg.labels[idx]}")
+        # 4) Volver a añadir las antiguas que no estén ya en los nuevos,
+        #    hasta completar la capacidad M
+        for idx in antiguos:
+            self.next2visit.add(idx)
+
+        # 5) Si tras el merge no queda nada, reanudar roaming
+        if not self.next2visit:
+            self.log.info("🔄 ASSIGN vacío → sigo en modo satélite")
+            return
+
+        # De vuelta al EQC: la visita se reanuda tras la entrega
+        if self.state == "rendezvous":
+            self.log.info(f"📬 Objetivos en espera hasta entregar: {[reg.labels[i] for i in self.next2visit]}")
+            return
 
+        # 6) Ordenar la ruta y arrancar la misión guiada con la lista combinada
+        if config.ROUTE_PLANNER == "2opt":
+            self._plan_route(antiguos)
+        coords  = [self._waypoint(idx) for idx in self.next2visit]
+        self.log.info(f"🗺️ Waypoints combinados: {coords}")
+        self.state = "visiting"
+        self._start_mission(coords)
+
+    def _plan_route(self, antiguos: List[int]) -> None:
+        """
+        Reordena next2visit: los objetivos que ya había conservan su orden
+        (ruta ya optimizada) y los nuevos se insertan; sin ruta previa, desde cero.
+        """
+        arrival = list(self.next2visit)
+        if len(arrival) < 2:
+            return
+        reg = registry()
+        start = (self.pos[0], self.pos[1])
+        targets = {idx: reg.xy[idx] for idx in arrival}
+        kept = [idx for idx in antiguos if idx in targets]
+        if kept:
+            new = [idx for idx in arrival if idx not in set(kept)]
+            route = route_planner.extend(start, targets, kept, new)
         else:
-            self.log.debug(f"⚠️ VQC-{self.id} recebeu mensagem desconhecida: {t}")
+            route = route_planner.plan(start, targets)
+        self.next2visit.reorder(route)
+        before = route_planner.path_length(start, [targets[i] for i in arrival])
+        after = route_planner.path_length(start, [targets[i] for i in route])
+        self.route_plans += 1
+        self.route_saved += before - after
+        self.log.info(f"🧭 Ruta: {after:.1f} m (orden de llegada {before:.1f} m, ahorro {before - after:.1f} m)")
+
+    def _drop_targets(self, dropped: List[int]) -> None:
+        """Subasta: PoIs comprometidos que ya no le tocan a este VQC."""
+        before = len(self.next2visit)
+        self.next2visit.discard_all(dropped)
+        if len(self.next2visit) == before:
+            return
+        self.log.info(f"🏷️ Subasta perdida: {[registry().labels[i] for i in dropped]}")
+        if self.state == "rendezvous":
+            return
+        if self.next2visit:
+            self._start_mission([self._waypoint(idx) for idx in self.next2visit])
+        else:
+            self.log.info("🔄 Sin PoIs por visitar → modo satélite")
+            self.maintain_satellite_mode()
+
+    def _known(self, idx: int) -> bool:
+        """PoI ya entregado, en el buffer, en custodia o cedido: no se vuelve a detectar."""
+        return (idx in self.visited or idx in self.discovered
+                or idx in self.carried or idx in self.relayed_out)
+
+    # --- Relevo store-carry-forward (RELAY) ---
+    def _eta_to_eqc(self) -> float:
+        """
+        Segundos estimados hasta quedar al alcance de radio del EQC: lo que
+        queda de la visita en curso más la intercepción desde su último
+        waypoint (o desde aquí si no está visitando). Si su hueco en la V queda
+        fuera de R_COMM no hay contacto previsto: DURATION, más lo que le
+        faltaría volar hasta R_COMM, para que el relevo avance fila a fila
+        hacia el EQC. Redondeado a ms, como viaja por radio.
+        """
+        now = self.provider.current_time()
+        if self.state == "visiting" and self._route:
+            dt, start = self._route_eta(), self._route[-1]
+        else:
+            dt, start = 0.0, self.pos
+        t_model = now + dt + self.eqc_offset
+        hit = eqc_trajectory().intercept(start, config.VQC_SPEED, t_model)
+        gap = self._slot_distance() - config.R_COMM
+        if hit is None or gap > 0:
+            return _ms(config.DURATION + max(gap, 0.0) / config.VQC_SPEED)
+        return _ms(dt + hit[0] - t_model)
+
+    def _offer_relay(self) -> None:
+        self._relay_eta = None
+        if not self.discovered and not self.carried:
+            return
+        eta = self._eta_to_eqc()
+        if eta < config.RELAY_MIN_ETA:
+            return
+        self._relay_eta = eta
+        msg = {"type": "RELAY_OFFER", "v_id": self.id, "eta": eta}
+        self.provider.send_communication_command(
+            CommunicationCommand(CommunicationCommandType.BROADCAST, self.wire.encode(msg)))
+        self.log.debug(f"📡 RELAY_OFFER: {len(self.discovered) + len(self.carried)} PoIs, ETA {eta:.2f}s")
+
+    def _accept_relay(self, offer) -> None:
+        free = config.M - len(self.carried)
+        eta = self._eta_to_eqc()
+        if free <= 0 or eta + config.RELAY_MARGIN > offer["eta"]:
+            return
+        msg = {"type": "RELAY_ACCEPT", "v_id": self.id, "eta": eta, "huecos": free}
+        self.provider.send_communication_command(
+            CommunicationCommand(CommunicationCommandType.SEND, self.wire.encode(msg), offer["v_id"]))
+
+    def _hand_over(self, accept) -> None:
+        """
+        Envía (hasta sus huecos) los PoIs propios y los que lleva en custodia al
+        primer vecino que acepta. Los conserva hasta su RELAY_ACK: si se pierde,
+        los entrega él mismo.
+        """
+        if self._relay_eta is None or accept["eta"] + config.RELAY_MARGIN > self._relay_eta:
+            return
+        self._relay_eta = None
+        items = [{"idx": idx, "origin": self.id, "ts": self.discovered_at[idx]}
+                 for idx in self.discovered if idx not in self._handing]
+        items += [{"idx": idx, "origin": self.carried_meta[idx][0], "ts": self.carried_meta[idx][1]}
+                  for idx in self.carried if idx not in self._handing]
+        items = items[:accept["huecos"]]
+        if not items:
+            return
+        msg = {"type": "RELAY", "v_id": self.id, "items": items}
+        self.provider.send_communication_command(
+            CommunicationCommand(CommunicationCommandType.SEND, self.wire.encode(msg), accept["v_id"]))
+        for e in items:
+            self._handing[e["idx"]] = accept["v_id"]
+        self.log.info(f"🤝 Relevo a VQC-{accept['v_id']} (ETA {accept['eta']:.2f}s): "
+                      f"{[registry().labels[e['idx']] for e in items]}")
+
+    def _take_custody(self, msg) -> None:
+        """Custodia de un RELAY hasta llenar carried; confirma (RELAY_ACK) los PoIs que ya tiene."""
+        taken, held, dropped = [], [], []
+        for e in msg["items"]:
+            idx = e["idx"]
+            if idx in self.visited or idx in self.discovered or idx in self.carried:
+                held.append(idx)        # duplicado: ya lo tiene o ya se entregó
+            elif self.carried.add(idx):
+                self.carried_meta[idx] = (e["origin"], e["ts"])
+                taken.append(idx)
+            else:
+                dropped.append(idx)     # carried lleno (otro relevo llegó antes): se queda con el emisor
+        self.relayed_in += len(taken)
+        ack = {"type": "RELAY_ACK", "v_id": self.id, "pids": taken + held}
+        self.provider.send_communication_command(
+            CommunicationCommand(CommunicationCommandType.SEND, self.wire.encode(ack), msg["v_id"]))
+        self.log.info(f"🤝 Custodia de VQC-{msg['v_id']}: {[registry().labels[i] for i in taken]}"
+                      + (f", sin hueco: {[registry().labels[i] for i in dropped]}" if dropped else ""))
+
+    def _release(self, ack) -> None:
+        """RELAY_ACK: suelta sólo los PoIs cedidos a ese VQC que confirma."""
+        released = [idx for idx in ack["pids"] if self._handing.get(idx) == ack["v_id"]]
+        for idx in released:
+            del self._handing[idx]
+            if idx in self.discovered:
+                self.discovered.discard(idx)
+                del self.discovered_at[idx]
+                self.relayed_out.add(idx)
+            elif idx in self.carried:
+                self.carried.discard(idx)
+                del self.carried_meta[idx]
+        self.log.debug(f"🤝 RELAY_ACK de VQC-{ack['v_id']}: {[registry().labels[i] for i in released]}")
+        if released and self.state == "rendezvous" and not self._must_deliver():
+            self._resume_visit()
+
+    def _must_deliver(self) -> bool:
+        """RENDEZVOUS: discovered lleno o con algún PoI de urgencia >= RENDEZVOUS_URGENCY."""
+        if self.discovered.full:
+            return True
+        urgency = registry().urgency
+        return any(urgency[i] >= config.RENDEZVOUS_URGENCY for i in self.discovered)
+
+    def _go_rendezvous(self) -> None:
+        """Vuelo a la posición prevista del EQC (trayectoria + desfase) para entregar."""
+        point = self.compute_intercept(formation=False)
+        self.log.info(f"📬 Rendezvous con el EQC en {point} (t≈{self.intercept_time:.2f}s)")
+        self.state = "rendezvous"
+        self._start_mission([point])
+
+    def _resume_visit(self) -> None:
+        """Tras entregar: seguir con los objetivos pendientes o volver a modo satélite."""
+        if not self.next2visit:
+            self.log.info("📬 Entregado, sin objetivos → modo satélite")
+            self.state = "satellite"
+            self.maintain_satellite_mode()
+            return
+        if config.ROUTE_PLANNER == "2opt":
+            self._plan_route(list(self.next2visit))
+        self.log.info(f"📬 Entregado → reanudo visita: {[registry().labels[i] for i in self.next2visit]}")
+        self.state = "visiting"
+        self._start_mission([self._waypoint(idx) for idx in self.next2visit])
+
+    def _auction_round(self) -> None:
+        """Ronda de subasta: pujar, comprometer lo ya asentado y difundir la tabla (BID)."""
+        now = self.provider.current_time()
+        self.auction.bid(self.pos[0], self.pos[1], config.M - len(self.next2visit), now)
+        won = self.auction.settled(now)
+        if won:
+            self.alloc_latencies += [(idx, now - self.auction.ts(idx)) for idx in won]
+            self.log.info(f"🏷️ Subasta ganada: {[registry().labels[i] for i in won]}")
+            self._merge_targets(won)
+        if not self.auction.changed and now - self._last_bid < config.AUCTION_HEARTBEAT - 1e-9:
+            return
+        entries = self.auction.entries(now)
+        if entries:
+            self._last_bid = now
+            msg = {"type": "BID", "v_id": self.id, "bids": entries}
+            self.provider.send_communication_command(
+                CommunicationCommand(CommunicationCommandType.BROADCAST, self.wire.encode(msg)))
+            self.log.debug(f"📤 BID: {len(entries)} entradas")
 
     def finish(self) -> None:
-        self.log.info(f"🏁 VQC-{self.id} finished — next2visit={self.next2visit}, visited={self.visited}")
+        reg = registry()
+        self.log.info(f"🏁 VQC-{self.id} finished — next2visit={[reg.labels[i] for i in self.next2visit]}, "
+                      f"visited={[reg.ids[i] for i in self.visited]}")
+        self.log.info(
+            f"📦 Buffers (tamaño/pico): discovered={len(self.discovered)}/{self.discovered.peak} (M={config.M}), "
+            f"next2visit={len(self.next2visit)}/{self.next2visit.peak} (M={config.M}), "
+            f"visited={len(self.visited)}"
+        )
         self.log.info(f"📊 Discoveries: casual={self.disc_casual}, assigned={self.disc_assigned}")
+        if self.relayed_in or self.relayed_out:
+            self.log.info(f"🤝 Relevos: {self.relayed_in} PoIs recibidos en custodia, "
+                          f"{len(self.relayed_out)} propios cedidos")
+        if self.rendezvous_trips:
+            self.log.info(f"📬 Vueltas al EQC para entregar: {self.rendezvous_trips}")
+        if self.route_plans:
+            self.log.info(f"🧭 Rutas planificadas: {self.route_plans}, ahorro total {self.route_saved:.1f} m")
+        t = self.provider.current_time() or 1.0
+        self.log.info(
+            f"⏱️ Eventos/s simulado: timers={self.timer_events / t:.2f}, "
+            f"misiones={self.mission_starts / t:.2f} (replanificaciones por desvío={self.drift_replans})"
+        )
+        if self.auction:
+            self.log.info(f"🏷️ Subasta: {self.auction.bids_placed} pujas, {self.auction.bids_lost} superadas, "
+                          f"{len(self.alloc_latencies)} PoIs comprometidos")
         never = [k for k,v in self._exec.items() if not v]
         if never:
             self.log.warning(f"⚠️ Métodos VQC nunca ejecutados: {never}")
@@ -361,18 +722,29 @@ class VQCProtocol(IProtocol):
     def send_deliver(self) -> None:
        # if not self.discovered:
        #     return        
-        pids = [d["id"] for d in self.discovered]
         msg = {
             "type": "DELIVER",
             "v_id": self.id,
-            "pids": [{"id":  d["id"],"label": d["label"]}for d in self.discovered]
+            "pids": list(self.discovered)
         }
         # 3) Cria e envia o comando ao EQC (id = 0)
         cmd = CommunicationCommand(
             CommunicationCommandType.SEND,
-            json.dumps(msg),
+            self.wire.encode(msg),
             0
         )
         self.provider.send_communication_command(cmd)
         # 4) Log para você ver no sim.log
-        self.log.info(f"📤 DELIVER enviado: {pids}")
+        self.log.info(f"📤 DELIVER enviado: {[registry().ids[i] for i in self.discovered]}")
+        if self.carried:
+            items = [{"idx": idx, "origin": self.carried_meta[idx][0], "ts": self.carried_meta[idx][1]}
+                     for idx in self.carried]
+            relay = {"type": "RELAY_DELIVER", "v_id": self.id, "items": items}
+            self.provider.send_communication_command(
+                CommunicationCommand(CommunicationCommandType.SEND, self.wire.encode(relay), 0))
+            self.log.info(f"📤 RELAY_DELIVER enviado: {[registry().ids[i] for i in self.carried]}")
+
+
+def _ms(t: float) -> float:
+    """Tiempo redondeado a ms (resolución del formato binario)."""
+    return round(t * 1000) / 1000
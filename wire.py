@@ -0,0 +1,318 @@
+"""
+Wire format shared by the E-QC and V-QC protocols:
+- Messages stay dicts inside the protocols ({"type": "HELLO", "v_id": ..., ...});
+  WireCodec turns them into what goes over the radio and back. PoIs are
+  registry indices in every format: ASSIGN and ANNOUNCE carry {"idx", "ts"}
+  entries, DELIVER and DELIVER_ACK lists of indices, and BID (auction mode,
+  auction.py) {"idx", "ts", "winner", "bid"} entries. The relay mode adds
+  RELAY_OFFER {"eta"}, RELAY_ACCEPT {"eta", "huecos"} and RELAY /
+  RELAY_DELIVER bundles of {"idx", "origin", "ts"} entries (origin: the
+  V-QC that discovered the PoI), and RELAY_ACK, a list of indices like
+  DELIVER_ACK.
+- Binary mode (default): versioned, struct-packed. PoI indices as uint16,
+  positions as int16 centimetres, times as uint32 milliseconds and bids as
+  float32.
+- JSON mode (config.WIRE_FORMAT = "json"): the original json.dumps payloads,
+  for debugging.
+- Object mode (config.WIRE_FORMAT = "object"): for in-process sweeps. The
+  CommunicationCommand carries an immutable, slotted Message that the receiver
+  reads like the decoded dict; nothing is encoded or decoded. With
+  config.WIRE_STRICT every message is also checked to round-trip through the
+  binary format, so object-mode results stay faithful to the real radio.
+- Every codec counts messages and bytes sent per message type, so radio
+  budgets can be sized from a run (object mode counts the binary size).
+"""
+import json
+import struct
+from types import MappingProxyType
+from typing import Any, Dict, List, Union
+
+from poi_registry import registry
+
+WIRE_VERSION = 1
+
+MESSAGE_TYPES = ["HELLO", "HELLO_ACK", "ASSIGN", "DELIVER", "DELIVER_ACK", "ANNOUNCE", "BID",
+                 "RELAY_OFFER", "RELAY_ACCEPT", "RELAY", "RELAY_DELIVER", "RELAY_ACK"]
+_CODE = {name: code for code, name in enumerate(MESSAGE_TYPES)}
+
+_HEADER = struct.Struct("<BBH")      # versión, tipo, v_id
+_POS = struct.Struct("<hhh")         # x, y, z en cm (±327 m)
+_COUNT = struct.Struct("<B")
+_HELLO = struct.Struct("<b")         # huecos
+_TIME = struct.Struct("<I")          # ms
+_ASSIGNED = struct.Struct("<HI")     # índice del PoI, instante de detección (ms)
+_INDEX = struct.Struct("<H")
+_BID = struct.Struct("<HIHf")        # índice del PoI, detección (ms), VQC ganador, puja
+_ACCEPT = struct.Struct("<Ib")       # ETA al EQC (ms), huecos
+_RELAYED = struct.Struct("<HHI")     # índice del PoI, VQC que lo descubrió, descubrimiento (ms)
+
+_QUANTUM = 0.005 + 1e-9     # mayor error de cuantización del formato binario (cm)
+
+
+class WireError(ValueError):
+    pass
+
+
+def _pack_pos(pos) -> bytes:
+    return _POS.pack(*(round(c * 100) for c in pos))
+
+
+def _unpack_pos(data: bytes, off: int) -> List[float]:
+    return [c / 100 for c in _POS.unpack_from(data, off)]
+
+
+def _indices(data: bytes, off: int, n: int, entry: struct.Struct) -> List[tuple]:
+    items = list(entry.iter_unpack(data[off:off + n * entry.size]))
+    if len(items) != n:
+        raise WireError(f"Mensaje truncado: {data!r}")
+    total = len(registry())
+    if any(item[0] >= total for item in items):
+        raise WireError(f"PoI desconocido en {data!r}")
+    return items
+
+
+def _frozen_entry(entry: Dict) -> MappingProxyType:
+    """Entrada de pois: dict → MappingProxyType (listas internas → tuplas)."""
+    return MappingProxyType({k: tuple(v) if type(v) is list else v for k, v in entry.items()})
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+_set = object.__setattr__
+
+
+class Message:
+    """
+    Mensaje inmutable del modo "object". Se lee como el dict decodificado
+    (msg["v_id"], msg.get("pids", [])); listas y dicts anidados quedan
+    congelados como tuplas y MappingProxyType, así un BROADCAST puede
+    compartir el mismo objeto entre todos los receptores.
+    """
+    __slots__ = ("type", "v_id", "_fields")
+
+    def __init__(self, msg: Dict):
+        t = msg["type"]
+        if t == "HELLO":
+            fields = {"huecos": msg["huecos"], "position": tuple(msg["position"])}
+        elif t == "HELLO_ACK":
+            fields = {"eqc_pos": tuple(msg["eqc_pos"]), "eqc_time": msg["eqc_time"]}
+        elif t in ("ASSIGN", "ANNOUNCE"):
+            fields = {"pois": tuple(map(_frozen_entry, msg["pois"]))}
+        elif t == "BID":
+            fields = {"bids": tuple(map(_frozen_entry, msg["bids"]))}
+        elif t == "RELAY_OFFER":
+            fields = {"eta": msg["eta"]}
+        elif t == "RELAY_ACCEPT":
+            fields = {"eta": msg["eta"], "huecos": msg["huecos"]}
+        elif t in ("RELAY", "RELAY_DELIVER"):
+            fields = {"items": tuple(map(_frozen_entry, msg["items"]))}
+        elif t in ("DELIVER", "DELIVER_ACK", "RELAY_ACK"):
+            fields = {"pids": tuple(msg["pids"])}
+        else:
+            raise WireError(f"Tipo de mensaje desconocido: {t!r}")
+        _set(self, "type", t)
+        _set(self, "v_id", msg["v_id"])
+        _set(self, "_fields", fields)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Message es inmutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Message es inmutable")
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "type":
+            return self.type
+        if key == "v_id":
+            return self.v_id
+        return self._fields[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in ("type", "v_id") or key in self._fields
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict:
+        return {"type": self.type, "v_id": self.v_id, **{k: _thaw(v) for k, v in self._fields.items()}}
+
+    def __repr__(self) -> str:
+        return f"Message({self.to_dict()!r})"
+
+
+def _binary_size(msg: Dict) -> int:
+    """Tamaño que tendría `msg` en formato binario, sin codificarlo."""
+    t = msg["type"]
+    if t == "HELLO":
+        return _HEADER.size + _HELLO.size + _POS.size
+    if t == "HELLO_ACK":
+        return _HEADER.size + _POS.size + _TIME.size
+    if t in ("ASSIGN", "ANNOUNCE"):
+        return _HEADER.size + _COUNT.size + len(msg["pois"]) * _ASSIGNED.size
+    if t == "BID":
+        return _HEADER.size + _COUNT.size + len(msg["bids"]) * _BID.size
+    if t == "RELAY_OFFER":
+        return _HEADER.size + _TIME.size
+    if t == "RELAY_ACCEPT":
+        return _HEADER.size + _ACCEPT.size
+    if t in ("RELAY", "RELAY_DELIVER"):
+        return _HEADER.size + _COUNT.size + len(msg["items"]) * _RELAYED.size
+    return _HEADER.size + _COUNT.size + len(msg["pids"]) * _INDEX.size
+
+
+def _mismatch(sent: Any, got: Any, path: str = "") -> str:
+    """Primera diferencia entre lo enviado y lo que llegaría por radio ('' si no hay)."""
+    if isinstance(sent, dict):
+        if not isinstance(got, dict) or sent.keys() != got.keys():
+            return f"{path or 'mensaje'}: campos {sorted(sent)} → {sorted(got) if isinstance(got, dict) else got!r}"
+        for k in sent:
+            diff = _mismatch(sent[k], got[k], f"{path}.{k}" if path else k)
+            if diff:
+                return diff
+        return ""
+    if isinstance(sent, (list, tuple)):
+        if not isinstance(got, (list, tuple)) or len(sent) != len(got):
+            return f"{path}: {sent!r} → {got!r}"
+        for i, (a, b) in enumerate(zip(sent, got)):
+            diff = _mismatch(a, b, f"{path}[{i}]")
+            if diff:
+                return diff
+        return ""
+    if isinstance(sent, float) or isinstance(got, float):
+        return "" if abs(sent - got) <= _QUANTUM else f"{path}: {sent!r} → {got!r}"
+    return "" if sent == got else f"{path}: {sent!r} → {got!r}"
+
+
+class WireCodec:
+
+    def __init__(self, mode: str = "binary", strict: bool = False):
+        """
+        mode: "binary", "json" u "object" (sin serializar, sólo en proceso).
+        strict: en modo "object", comprueba que cada mensaje sobreviviría a
+        la ida y vuelta por el formato binario (WireError si no).
+        """
+        if mode not in ("binary", "json", "object"):
+            raise WireError(f"Formato de mensaje desconocido: {mode!r}")
+        self.mode = mode
+        self.strict = strict
+        self.sent_msgs: Dict[str, int] = {t: 0 for t in MESSAGE_TYPES}
+        self.sent_bytes: Dict[str, int] = {t: 0 for t in MESSAGE_TYPES}
+
+    # ——— Envío ———
+    def encode(self, msg: Dict) -> Union[bytes, str, Message]:
+        t = msg["type"]
+        if self.mode == "json":
+            data = json.dumps(msg)
+            size = len(data.encode())
+        elif self.mode == "object":
+            if self.strict:
+                self._check_round_trip(msg)
+            data = Message(msg)
+            size = _binary_size(msg)
+        else:
+            data = self._encode_binary(msg)
+            size = len(data)
+        self.sent_msgs[t] += 1
+        self.sent_bytes[t] += size
+        return data
+
+    def _check_round_trip(self, msg: Dict) -> None:
+        try:
+            back = self.decode(self._encode_binary(msg))
+        except struct.error as e:
+            raise WireError(f"{msg['type']} no cabe en el formato binario: {e}") from e
+        diff = _mismatch(msg, back)
+        if diff:
+            raise WireError(f"{msg['type']} no sobrevive al formato binario: {diff}")
+
+    def _encode_binary(self, msg: Dict) -> bytes:
+        t = msg["type"]
+        out = [_HEADER.pack(WIRE_VERSION, _CODE[t], msg["v_id"])]
+        if t == "HELLO":
+            out += [_HELLO.pack(msg["huecos"]), _pack_pos(msg["position"])]
+        elif t == "HELLO_ACK":
+            out += [_pack_pos(msg["eqc_pos"]), _TIME.pack(round(msg["eqc_time"] * 1000))]
+        elif t in ("ASSIGN", "ANNOUNCE"):
+            pois = msg["pois"]
+            out.append(_COUNT.pack(len(pois)))
+            out += [_ASSIGNED.pack(p["idx"], round(p.get("ts", 0.0) * 1000)) for p in pois]
+        elif t == "BID":
+            bids = msg["bids"]
+            out.append(_COUNT.pack(len(bids)))
+            out += [_BID.pack(b["idx"], round(b["ts"] * 1000), b["winner"], b["bid"]) for b in bids]
+        elif t == "RELAY_OFFER":
+            out.append(_TIME.pack(round(msg["eta"] * 1000)))
+        elif t == "RELAY_ACCEPT":
+            out.append(_ACCEPT.pack(round(msg["eta"] * 1000), msg["huecos"]))
+        elif t in ("RELAY", "RELAY_DELIVER"):
+            items = msg["items"]
+            out.append(_COUNT.pack(len(items)))
+            out += [_RELAYED.pack(e["idx"], e["origin"], round(e["ts"] * 1000)) for e in items]
+        else:   # DELIVER, DELIVER_ACK y RELAY_ACK
+            pids = msg["pids"]
+            out.append(_COUNT.pack(len(pids)))
+            out += [_INDEX.pack(i) for i in pids]
+        return b"".join(out)
+
+    # ——— Recepción ———
+    def decode(self, data: Union[bytes, str, Message]) -> Union[Dict, Message]:
+        """Mensaje recibido → dict con la misma forma que el JSON original (o el Message tal cual)."""
+        if isinstance(data, Message):
+            return data
+        if isinstance(data, str):
+            return json.loads(data)
+        try:
+            version, code, vid = _HEADER.unpack_from(data, 0)
+        except struct.error as e:
+            raise WireError(f"Mensaje truncado: {data!r}") from e
+        if version != WIRE_VERSION:
+            raise WireError(f"Versión de mensaje no soportada: {version}")
+        t = MESSAGE_TYPES[code]
+        msg = {"type": t, "v_id": vid}
+        off = _HEADER.size
+        if t == "HELLO":
+            msg["huecos"] = _HELLO.unpack_from(data, off)[0]
+            msg["position"] = _unpack_pos(data, off + _HELLO.size)
+        elif t == "HELLO_ACK":
+            msg["eqc_pos"] = _unpack_pos(data, off)
+            msg["eqc_time"] = _TIME.unpack_from(data, off + _POS.size)[0] / 1000
+        elif t in ("ASSIGN", "ANNOUNCE"):
+            n = _COUNT.unpack_from(data, off)[0]
+            msg["pois"] = [{"idx": i, "ts": ts / 1000}
+                           for i, ts in _indices(data, off + _COUNT.size, n, _ASSIGNED)]
+        elif t == "BID":
+            n = _COUNT.unpack_from(data, off)[0]
+            msg["bids"] = [{"idx": i, "ts": ts / 1000, "winner": w, "bid": b}
+                           for i, ts, w, b in _indices(data, off + _COUNT.size, n, _BID)]
+        elif t == "RELAY_OFFER":
+            msg["eta"] = _TIME.unpack_from(data, off)[0] / 1000
+        elif t == "RELAY_ACCEPT":
+            eta, huecos = _ACCEPT.unpack_from(data, off)
+            msg["eta"], msg["huecos"] = eta / 1000, huecos
+        elif t in ("RELAY", "RELAY_DELIVER"):
+            n = _COUNT.unpack_from(data, off)[0]
+            msg["items"] = [{"idx": i, "origin": o, "ts": ts / 1000}
+                            for i, o, ts in _indices(data, off + _COUNT.size, n, _RELAYED)]
+        else:
+            n = _COUNT.unpack_from(data, off)[0]
+            msg["pids"] = [i for (i,) in _indices(data, off + _COUNT.size, n, _INDEX)]
+        return msg
+
+
+def merge_stats(codecs) -> Dict[str, Dict[str, int]]:
+    """Suma los contadores de varios codecs: tipo → {"msgs", "bytes"}."""
+    total = {t: {"msgs": 0, "bytes": 0} for t in MESSAGE_TYPES}
+    for c in codecs:
+        for t in MESSAGE_TYPES:
+            total[t]["msgs"] += c.sent_msgs[t]
+            total[t]["bytes"] += c.sent_bytes[t]
+    return total